@@ -0,0 +1,301 @@
+"""
+Benchmark runner: starts the a4f stub and the real app under uvicorn, drives
+scripted scenarios against the app and writes a latency/throughput report.
+
+  python -m bench.run                                  # all scenarios, 10 s each
+  python -m bench.run -s chat,stream -d 30 -c 64
+  python -m bench.run --out bench/results/$(git rev-parse --short HEAD).json
+  python -m bench.run --compare bench/results/abc123.json
+
+Run from backend/. Stub behaviour (latency, payload sizes, error rate) is set
+with the STUB_* variables documented in bench/stub_a4f.py; they are passed
+through to the stub process. Use --app-url to target an app that is already
+running (it must itself be pointed at the stub via A4F_API_BASE and
+A4F_DISPLAY_API).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+Scenario = Callable[[httpx.AsyncClient, int, "Recorder"], Awaitable[None]]
+
+
+class Recorder:
+    """
+    Collects per-request latencies and failures for one scenario
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.first_byte: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.bytes_received = 0
+
+    def record(self, started: float, response: Optional[httpx.Response] = None, size: int = 0, error: Optional[str] = None) -> None:
+        if error is None and response is not None and response.status_code >= 400:
+            error = str(response.status_code)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+            return
+        self.latencies.append(time.perf_counter() - started)
+        self.bytes_received += size
+
+    def report(self, elapsed: float) -> Dict:
+        ordered = sorted(self.latencies)
+        report = {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "mb_per_second": round(self.bytes_received / elapsed / 1e6, 3) if elapsed else 0.0,
+            "latency_ms": _percentiles(ordered),
+        }
+        if self.first_byte:
+            report["first_byte_ms"] = _percentiles(sorted(self.first_byte))
+        return report
+
+
+def _percentiles(ordered: List[float]) -> Dict:
+    if not ordered:
+        return {}
+
+    def at(percentile: float) -> float:
+        # Nearest-rank percentile
+        position = max(0, min(len(ordered) - 1, int(round(percentile / 100 * len(ordered))) - 1))
+        return round(ordered[position] * 1000, 2)
+
+    return {
+        "p50": at(50),
+        "p95": at(95),
+        "p99": at(99),
+        "max": round(ordered[-1] * 1000, 2),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+
+
+async def _request(client: httpx.AsyncClient, recorder: Recorder, method: str, url: str, **kwargs) -> None:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        recorder.record(started, error=type(e).__name__)
+        return
+    recorder.record(started, response, len(response.content))
+
+
+def _api_key(worker: int) -> str:
+    # One key per worker so per-key admission limits do not serialize the run
+    return f"bench-key-{worker}"
+
+
+async def catalog_polling(client: httpx.AsyncClient, worker: int, recorder: Recorder) -> None:
+    path = random.choice([
+        "/api/models",
+        "/api/models?tier=pro",
+        "/api/models?category=chat_completion&sort=-context_window&limit=50",
+        "/api/models/search?q=model&limit=20",
+        f"/api/models/free-model-{random.randrange(100)}",
+    ])
+    await _request(client, recorder, "GET", path, headers={"Accept-Encoding": "gzip"})
+
+
+async def concurrent_chat(client: httpx.AsyncClient, worker: int, recorder: Recorder) -> None:
+    # A nonce keeps requests distinct so single-flight merging does not flatter the numbers
+    payload = {"model": "free-model-0", "messages": [{"role": "user", "content": f"hello {random.random()}"}]}
+    await _request(client, recorder, "POST", "/api/playground/text", json=payload, headers={"X-API-Key": _api_key(worker)})
+
+
+async def streaming_chat(client: httpx.AsyncClient, worker: int, recorder: Recorder) -> None:
+    payload = {"model": "free-model-0", "messages": [{"role": "user", "content": f"hello {random.random()}"}], "stream": True}
+    started = time.perf_counter()
+    size = 0
+    try:
+        async with client.stream("POST", "/api/playground/text", json=payload, headers={"X-API-Key": _api_key(worker)}) as response:
+            async for chunk in response.aiter_raw():
+                if not size:
+                    recorder.first_byte.append(time.perf_counter() - started)
+                size += len(chunk)
+    except httpx.HTTPError as e:
+        recorder.record(started, error=type(e).__name__)
+        return
+    recorder.record(started, response, size)
+
+
+def audio_upload(upload_bytes: int) -> Scenario:
+    audio = b"RIFF" + os.urandom(max(0, upload_bytes - 4))
+
+    async def scenario(client: httpx.AsyncClient, worker: int, recorder: Recorder) -> None:
+        await _request(
+            client, recorder, "POST", "/api/playground/audio/transcribe",
+            files={"file": ("bench.wav", audio, "audio/wav")},
+            headers={"X-API-Key": _api_key(worker)}
+        )
+
+    return scenario
+
+
+async def run_scenario(app_url: str, name: str, scenario: Scenario, duration: float, concurrency: int, warmup: float) -> Dict:
+    """
+    Closed-loop load: `concurrency` workers each issue requests back to back
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=60) as client:
+        warm = Recorder(name)
+        warm_deadline = time.perf_counter() + warmup
+        while time.perf_counter() < warm_deadline:
+            await scenario(client, 0, warm)
+
+        recorder = Recorder(name)
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int) -> None:
+            while time.perf_counter() < deadline:
+                await scenario(client, index, recorder)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return recorder.report(time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process serving {url} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout} s")
+
+
+def _start(args: List[str], env: Dict[str, str], log: Optional[str] = None) -> subprocess.Popen:
+    output = open(log, "ab") if log else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, current: Dict) -> None:
+    """
+    Print per-scenario deltas between two reports
+    """
+    print(f"\n{'scenario':<12} {'metric':<8} {baseline.get('commit') or 'baseline':>12} {current.get('commit') or 'current':>12} {'change':>9}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        rows = [("rps", before["rps"], result["rps"])]
+        rows += [(p, before["latency_ms"].get(p), result["latency_ms"].get(p)) for p in ("p50", "p95", "p99")]
+        for metric, old, new in rows:
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:<12} {metric:<8} {old:>12} {new:>12} {change:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the API against a local a4f stub")
+    parser.add_argument("-s", "--scenarios", default="catalog,chat,stream,upload")
+    parser.add_argument("-d", "--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=float, default=1, help="seconds of single-worker warm-up per scenario")
+    parser.add_argument("--upload-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--app-url", help="benchmark an already running app instead of starting one")
+    parser.add_argument("--app-log", help="append stub and app output to this file instead of discarding it")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report to compare against")
+    args = parser.parse_args()
+
+    scenarios: Dict[str, Scenario] = {
+        "catalog": catalog_polling,
+        "chat": concurrent_chat,
+        "stream": streaming_chat,
+        "upload": audio_upload(args.upload_bytes),
+    }
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    processes: List[subprocess.Popen] = []
+    app_url = args.app_url
+    try:
+        if not app_url:
+            stub_port, app_port = _free_port(), _free_port()
+            env = dict(os.environ)
+            processes.append(_start(["-m", "bench.stub_a4f", "--port", str(stub_port)], env, args.app_log))
+            _wait_for(f"http://127.0.0.1:{stub_port}/docs", processes[-1])
+
+            env.update({
+                "A4F_API_BASE": f"http://127.0.0.1:{stub_port}/v1",
+                "A4F_DISPLAY_API": f"http://127.0.0.1:{stub_port}/api",
+            })
+            env.setdefault("CATALOG_SNAPSHOT_LOAD_TIMEOUT", "1")
+            processes.append(_start([
+                "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(app_port),
+                "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"
+            ], env, args.app_log))
+            app_url = f"http://127.0.0.1:{app_port}"
+            _wait_for(f"{app_url}/api/", processes[-1])
+
+        report = {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {
+                "duration": args.duration,
+                "concurrency": args.concurrency,
+                "workers": args.workers,
+                "upload_bytes": args.upload_bytes,
+                "stub": {key: value for key, value in os.environ.items() if key.startswith("STUB_")},
+            },
+            "scenarios": {},
+        }
+        for name in selected:
+            result = asyncio.run(run_scenario(app_url, name, scenarios[name], args.duration, args.concurrency, args.warmup))
+            report["scenarios"][name] = result
+            latency = result["latency_ms"]
+            print(
+                f"{name:<10} {result['rps']:>9.1f} req/s  p50 {latency.get('p50', 0):>8.2f} ms  "
+                f"p95 {latency.get('p95', 0):>8.2f} ms  p99 {latency.get('p99', 0):>8.2f} ms  errors {sum(result['errors'].values())}"
+            )
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Per-route before/after benchmark for the JSON codec: runs the same requests
+in-process against the app with JSON_CODEC=json and JSON_CODEC=orjson and
+prints the per-request time of each route.
+
+  python -m bench.serialization
+  python -m bench.serialization --requests 2000 --rounds 5 --models-per-tier 500
+
+Run from backend/. The upstream is the bench stub app, mounted in-process
+with no added latency, so the numbers are dominated by the app's own
+request handling and serialization.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from bench.run import BACKEND_DIR
+
+CODECS = ("json", "orjson")
+
+
+def _routes(models_per_tier: int) -> List[Tuple[str, str, str, Dict]]:
+    chat = {"model": "free-model-0", "messages": [{"role": "user", "content": "hello"}]}
+    return [
+        ("models sorted page", "GET", "/api/models?sort=name&limit=200", {}),
+        ("models projected", "GET", "/api/models?fields=name,tier,context_window&limit=500", {}),
+        ("model by name", "GET", f"/api/models/free-model-{models_per_tier // 2}", {}),
+        ("models search", "GET", "/api/models/search?q=benchmark%20model&limit=100", {}),
+        ("chat completion", "POST", "/api/playground/text", {"json": chat, "headers": {"X-API-Key": "bench"}}),
+        ("chat batch x20", "POST", "/api/playground/text/batch", {"json": {"requests": [chat] * 20}, "headers": {"X-API-Key": "bench"}}),
+        ("stats", "GET", "/api/stats", {}),
+    ]
+
+
+async def _measure(requests: int, models_per_tier: int, rounds: int) -> Dict[str, float]:
+    import httpx
+    import services.a4f_service as a4f_service
+    from bench.stub_a4f import app as stub_app
+    from server import app
+
+    # Route upstream calls to the stub app in-process
+    a4f_service._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app), base_url="http://stub")
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        for name, method, path, kwargs in _routes(models_per_tier):
+            for _ in range(max(1, requests // 10)):
+                (await client.request(method, path, **kwargs)).raise_for_status()
+            # Best of several rounds, to keep scheduler noise out of small routes
+            for _ in range(rounds):
+                started = time.perf_counter()
+                for _ in range(requests):
+                    await client.request(method, path, **kwargs)
+                elapsed = (time.perf_counter() - started) / requests * 1e6
+                results[name] = min(results.get(name, elapsed), elapsed)
+    return results
+
+
+def _run_codec(codec: str, requests: int, models_per_tier: int, rounds: int) -> Dict[str, float]:
+    env = dict(os.environ)
+    env.update({
+        "JSON_CODEC": codec,
+        "A4F_API_BASE": "http://stub/v1",
+        "A4F_DISPLAY_API": "http://stub/api",
+        "STUB_LATENCY_MS": "0",
+        "STUB_JITTER_MS": "0",
+        "STUB_ERROR_RATE": "0",
+        "STUB_MODELS_PER_TIER": str(models_per_tier),
+    })
+    output = subprocess.check_output(
+        [sys.executable, "-m", "bench.serialization", "--worker", "--requests", str(requests), "--models-per-tier", str(models_per_tier), "--rounds", str(rounds)],
+        cwd=BACKEND_DIR, env=env, stderr=subprocess.DEVNULL
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare JSON codecs per route")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per route")
+    parser.add_argument("--models-per-tier", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3, help="rounds per route; the fastest is reported")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import logging
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(asyncio.run(_measure(args.requests, args.models_per_tier, args.rounds))))
+        return
+
+    before, after = (_run_codec(codec, args.requests, args.models_per_tier, args.rounds) for codec in CODECS)
+    print(f"{'route':<20} {'json us/req':>12} {'orjson us/req':>14} {'change':>8}")
+    for name in before:
+        change = (after[name] - before[name]) / before[name] * 100
+        print(f"{name:<20} {before[name]:>12.1f} {after[name]:>14.1f} {change:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Startup-time report: per-module import cost of the app and the time from
+process launch until the first request is served.
+
+  python -m bench.startup                       # print the report
+  python -m bench.startup --out startup.json    # also write it for CI
+  python -m bench.startup --compare startup.json --max-regression 20
+
+Run from backend/. Import times come from `python -X importtime` in a fresh
+interpreter. Time to first request launches uvicorn and polls GET /api/
+until it answers; --runs repeats this and reports the median. With
+--max-regression the exit status is 1 when either total grew by more than
+that percentage over the --compare report.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from bench.run import BACKEND_DIR, _free_port, _git_commit
+
+APP_PACKAGES = ("server", "routes", "services")
+
+
+def import_times(module: str = "server") -> Dict[str, float]:
+    """
+    Cumulative import time in ms per module, from -X importtime
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=dict(os.environ), check=True
+    )
+    times: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name] = int(cumulative) / 1000
+    return times
+
+
+def summarize_imports(times: Dict[str, float], module: str = "server", top: int = 15) -> Dict:
+    """
+    Split import cost into the app's own modules and the heaviest top-level
+    third-party packages
+    """
+    app_modules = {name: ms for name, ms in times.items() if name.split(".")[0] in APP_PACKAGES}
+    packages: Dict[str, float] = {}
+    for name, ms in times.items():
+        root = name.split(".")[0]
+        if root in APP_PACKAGES or root.startswith("_"):
+            continue
+        # Cumulative times nest, so the largest entry under a package is its best estimate
+        packages[root] = max(packages.get(root, 0.0), ms)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(times.get(module, 0.0), 1),
+        "app_modules_ms": {name: round(ms, 1) for name, ms in sorted(app_modules.items(), key=lambda item: item[1], reverse=True)},
+        "heaviest_packages_ms": {name: round(ms, 1) for name, ms in heaviest},
+    }
+
+
+def time_to_first_request(timeout: float = 60) -> float:
+    """
+    Launch the app under uvicorn and return seconds until GET /api/ succeeds
+    """
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"app exited with {process.returncode} before serving a request")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/api/").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError(f"app did not serve a request within {timeout} s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _regressions(baseline: Dict, report: Dict, max_regression: float) -> List[str]:
+    failures = []
+    for label, before, after in (
+        ("import total", baseline["imports"]["total_ms"], report["imports"]["total_ms"]),
+        ("first request", baseline["first_request_ms"], report["first_request_ms"]),
+    ):
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{label:<14} {before:>9.1f} ms -> {after:>9.1f} ms  {change:+.1f}%")
+        if change > max_regression:
+            failures.append(f"{label} regressed {change:.1f}% (limit {max_regression}%)")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report app import time and time to first request")
+    parser.add_argument("--runs", type=int, default=3, help="launches to take the median time to first request over")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, help="fail when a total regresses by more than this percentage")
+    args = parser.parse_args()
+
+    imports = summarize_imports(import_times())
+    first_request = [time_to_first_request() * 1000 for _ in range(max(1, args.runs))]
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "imports": imports,
+        "first_request_ms": round(statistics.median(first_request), 1),
+        "first_request_runs_ms": [round(ms, 1) for ms in first_request],
+    }
+
+    print(f"import server: {imports['total_ms']:.1f} ms")
+    for name, ms in list(imports["app_modules_ms"].items())[:10]:
+        print(f"  {name:<32} {ms:>8.1f} ms")
+    print("heaviest packages:")
+    for name, ms in imports["heaviest_packages_ms"].items():
+        print(f"  {name:<32} {ms:>8.1f} ms")
+    print(f"time to first request: {report['first_request_ms']:.1f} ms (median of {len(first_request)})")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2))
+
+    failures: List[str] = []
+    if args.compare:
+        failures = _regressions(json.loads(Path(args.compare).read_text()), report, args.max_regression if args.max_regression is not None else float("inf"))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
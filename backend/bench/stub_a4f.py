@@ -0,0 +1,146 @@
+"""
+Local stand-in for the a4f API used by the benchmarks.
+
+Serves both upstream hosts from one process:
+  /v1/...                       -> api.a4f.co/v1
+  /api/get-display-models       -> www.a4f.co/api/get-display-models
+
+Behaviour is set through environment variables so the runner can start it
+as a subprocess:
+  STUB_LATENCY_MS        mean added latency per request (default 50)
+  STUB_JITTER_MS         uniform +/- jitter around the mean (default 10)
+  STUB_ERROR_RATE        share of requests answered with 503 (default 0)
+  STUB_MODELS_PER_TIER   catalog size per tier (default 200)
+  STUB_COMPLETION_BYTES  chat completion content size (default 512)
+  STUB_STREAM_CHUNKS     SSE events per streamed completion (default 50)
+  STUB_AUDIO_BYTES       generated speech size (default 256 KiB)
+
+Run: python -m bench.stub_a4f --port 9100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+STUB_LATENCY_MS = float(os.environ.get('STUB_LATENCY_MS', '50'))
+STUB_JITTER_MS = float(os.environ.get('STUB_JITTER_MS', '10'))
+STUB_ERROR_RATE = float(os.environ.get('STUB_ERROR_RATE', '0'))
+STUB_MODELS_PER_TIER = int(os.environ.get('STUB_MODELS_PER_TIER', '200'))
+STUB_COMPLETION_BYTES = int(os.environ.get('STUB_COMPLETION_BYTES', '512'))
+STUB_STREAM_CHUNKS = int(os.environ.get('STUB_STREAM_CHUNKS', '50'))
+STUB_AUDIO_BYTES = int(os.environ.get('STUB_AUDIO_BYTES', str(256 * 1024)))
+
+MODEL_TYPES = ["chat", "image", "tts", "transcription", "embedding", "video"]
+
+app = FastAPI(title="a4f stub")
+
+
+async def _delay() -> None:
+    latency = STUB_LATENCY_MS + random.uniform(-STUB_JITTER_MS, STUB_JITTER_MS)
+    if latency > 0:
+        await asyncio.sleep(latency / 1000)
+
+
+def _failed() -> bool:
+    return STUB_ERROR_RATE > 0 and random.random() < STUB_ERROR_RATE
+
+
+def _error() -> JSONResponse:
+    return JSONResponse({"error": {"message": "stub upstream error"}}, status_code=503)
+
+
+def _catalog(plan: str) -> dict:
+    return {
+        "models": [
+            {
+                "name": f"{plan}-model-{i}",
+                "base_model": f"{plan}/base-{i}",
+                "type": MODEL_TYPES[i % len(MODEL_TYPES)],
+                "description": f"Benchmark model {i} on the {plan} plan",
+                "features": ["vision", "tools"] if i % 2 else ["json"],
+                "context_window": 4096 * (1 + i % 32),
+            }
+            for i in range(STUB_MODELS_PER_TIER)
+        ]
+    }
+
+
+_catalogs = {}
+
+
+@app.get("/api/get-display-models")
+async def get_display_models(plan: str = "free"):
+    await _delay()
+    if _failed():
+        return _error()
+    if plan not in _catalogs:
+        _catalogs[plan] = _catalog(plan)
+    return _catalogs[plan]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    await _delay()
+    if _failed():
+        return _error()
+
+    if payload.get("stream"):
+        piece = "x" * max(1, STUB_COMPLETION_BYTES // max(1, STUB_STREAM_CHUNKS))
+
+        async def events():
+            for _ in range(STUB_STREAM_CHUNKS):
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n".encode()
+                await asyncio.sleep(0)
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        "id": "chatcmpl-stub",
+        "model": payload.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "x" * STUB_COMPLETION_BYTES}}],
+        "usage": {"prompt_tokens": 16, "completion_tokens": STUB_COMPLETION_BYTES // 4, "total_tokens": 16 + STUB_COMPLETION_BYTES // 4},
+    }
+
+
+@app.post("/v1/audio/transcriptions")
+async def audio_transcriptions(request: Request):
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    await _delay()
+    if _failed():
+        return _error()
+    return {"text": f"transcribed {size} bytes"}
+
+
+@app.post("/v1/audio/speech")
+async def audio_speech():
+    await _delay()
+    if _failed():
+        return _error()
+    return Response(content=b"ID3" + b"\0" * STUB_AUDIO_BYTES, media_type="audio/mpeg")
+
+
+@app.post("/v1/images/generations")
+async def images_generations():
+    await _delay()
+    if _failed():
+        return _error()
+    # 1x1 transparent PNG
+    return {"data": [{"b64_json": "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="}]}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local a4f stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
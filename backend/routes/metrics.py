@@ -0,0 +1,47 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from routes import playground
+from services.a4f_service import get_a4f_service, single_flight
+from services.metrics import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _cache_lookups():
+    catalog = get_a4f_service().catalog
+    response_cache = playground.response_cache
+    return {
+        ("catalog",): (catalog.hits + catalog.stale_hits, catalog.misses),
+        ("response",): (response_cache.hits, response_cache.misses),
+        # A merged call is served from another caller's in-flight request
+        ("single_flight",): (single_flight.merged, single_flight.executions),
+    }
+
+registry.callback(
+    "cache_hits_total", "Lookups served from a cache", ("cache",),
+    lambda: {cache: hits for cache, (hits, _) in _cache_lookups().items()}, kind="counter"
+)
+registry.callback(
+    "cache_misses_total", "Lookups that went upstream", ("cache",),
+    lambda: {cache: misses for cache, (_, misses) in _cache_lookups().items()}, kind="counter"
+)
+registry.callback(
+    "cache_hit_ratio", "Share of lookups served from a cache since startup", ("cache",),
+    lambda: {cache: hits / (hits + misses) if hits + misses else 0.0 for cache, (hits, misses) in _cache_lookups().items()}
+)
+registry.callback(
+    "admission_active_requests", "Upstream calls holding an admission slot", (),
+    lambda: {(): playground.admission.stats()["active"]}
+)
+registry.callback(
+    "admission_queue_depth", "Requests waiting for an admission slot", (),
+    lambda: {(): playground.admission.stats()["queue_depth"]}
+)
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Expose request, upstream and cache metrics in Prometheus text format
+    """
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,49 +1,149 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response
 from typing import Optional, List
-from services.a4f_service import A4FService
+from services.a4f_service import A4FService, get_a4f_service
+from services.http_cache import CATALOG_CACHE_CONTROL, etag_matches
+from services.json_codec import APIJSONResponse
+import base64
+import binascii
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-a4f_service = A4FService()
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        offset = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+def _catalog_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=_catalog_headers(etag))
 
 @router.get("/models")
 async def get_models(
     tier: Optional[str] = Query(None, description="Filter by tier: free, basic, pro, ultra"),
-    category: Optional[str] = Query(None, description="Filter by category: chat_completion, image_generation, image_edits, audio_speech, audio_transcription, embeddings, video")
+    category: Optional[str] = Query(None, description="Filter by category: chat_completion, image_generation, image_edits, audio_speech, audio_transcription, embeddings, video"),
+    sort: Optional[str] = Query(None, pattern=r"^-?(name|context_window|tier)$", description="Sort by name, context_window or tier; prefix with '-' for descending"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum number of models to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of model fields to return"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
 ):
     """
     Fetch all AI models from a4f.co
     """
     try:
-        if tier:
-            data = a4f_service.get_display_models(tier)
-            models = data.get('models', [])
-        else:
-            models = a4f_service.get_all_models()
+        index = await a4f_service.get_catalog_index()
+        if etag_matches(if_none_match, index.etag):
+            return _not_modified(index.etag)
+        
+        if category == 'all':
+            category = None
         
-        # Apply category filter if provided
-        if category and category != 'all':
-            models = [m for m in models if m.get('category') == category]
+        # Plain filter queries are served from bodies serialized at refresh time
+        if not (sort or limit or cursor or fields):
+            body = index.bodies.get(tier, category)
+            if body is not None:
+                content, encoding = body.select(accept_encoding)
+                headers = _catalog_headers(index.etag)
+                if encoding:
+                    headers["Content-Encoding"] = encoding
+                return Response(content=content, media_type="application/json", headers=headers)
         
-        return {"models": models, "count": len(models)}
+        models = index.sorted_view(tier=tier, category=category, sort=sort)
+        total = len(models)
+        
+        offset = _decode_cursor(cursor) if cursor else 0
+        end = total if limit is None else offset + limit
+        page = models[offset:end]
+        next_cursor = _encode_cursor(end) if end < total else None
+        
+        if fields:
+            wanted = [f.strip() for f in fields.split(',') if f.strip()]
+            page = [{f: m[f] for f in wanted if f in m} for m in page]
+        
+        failed_tiers = index.failed_tiers
+        if tier:
+            failed_tiers = [t for t in failed_tiers if t == tier]
+        
+        # Catalog data is plain JSON already, so skip FastAPI's jsonable_encoder pass
+        return APIJSONResponse({
+            "models": page,
+            "count": len(page),
+            "total": total,
+            "next_cursor": next_cursor,
+            "failed_tiers": failed_tiers
+        }, headers=_catalog_headers(index.etag))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching models: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/models/search")
+async def search_models(
+    q: str = Query(..., min_length=1, description="Search terms; each term also matches as a prefix"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of results per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    tier: Optional[str] = Query(None, description="Filter by tier: free, basic, pro, ultra"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    a4f_service: A4FService = Depends(get_a4f_service)
+):
+    """
+    Search models by name, base model, features, type, category and description.
+    Results are paged; pass next_cursor back as cursor for the next page.
+    """
+    try:
+        index = await a4f_service.get_catalog_index()
+        
+        if category == 'all':
+            category = None
+        matches = index.search.search(q, limit=None, tier=tier, category=category)
+        total = len(matches)
+        
+        offset = _decode_cursor(cursor) if cursor else 0
+        end = offset + limit
+        models = matches[offset:end]
+        next_cursor = _encode_cursor(end) if end < total else None
+        
+        return APIJSONResponse({"models": models, "count": len(models), "total": total, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching models: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/models/{model_name}")
-async def get_model_by_name(model_name: str):
+async def get_model_by_name(
+    model_name: str,
+    if_none_match: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
+):
     """
     Get specific model details
     """
     try:
-        models = a4f_service.get_all_models()
-        model = next((m for m in models if m.get('base_model') == model_name or m.get('name') == model_name), None)
+        index = await a4f_service.get_catalog_index()
+        model = index.get(model_name)
         
         if not model:
             raise HTTPException(status_code=404, detail="Model not found")
         
-        return model
+        if etag_matches(if_none_match, index.etag):
+            return _not_modified(index.etag)
+        return APIJSONResponse(model, headers={"ETag": index.etag, "Cache-Control": CATALOG_CACHE_CONTROL})
     except HTTPException:
         raise
     except Exception as e:
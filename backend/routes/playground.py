@@ -1,18 +1,72 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File
-from pydantic import BaseModel
-from typing import List, Dict, Optional
-from services.a4f_service import A4FService
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, UploadFile, File, Path
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from services.a4f_service import A4FService, UpstreamStream, get_a4f_service
+from services.admission import AdmissionController
+from services.audio_store import AudioStore
+from services.file_responses import ranged_file_response
+from services.fingerprint import api_key_hash
+from services.http_cache import etag_matches
+from services.json_codec import APIJSONResponse, dumps
+from services.image_store import IMAGE_CACHE_CONTROL, IMAGE_OFFLOAD_ENABLED, IMAGE_URL_PREFIX, ImageStore
+from services.response_cache import ResponseCache
+from services.upload_tracker import MAX_UPLOAD_BYTES, UploadTracker, resident_bytes, upload_size
+from services.usage import UsageRecorder
+import asyncio
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-a4f_service = A4FService()
+
+# Batch endpoint limits; streaming items in a batch are run as regular completions
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '1000'))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', '16'))
+audio_store = AudioStore()
+image_store = ImageStore()
+upload_tracker = UploadTracker()
+response_cache = ResponseCache()
+admission = AdmissionController()
+# Attached to the database and flushed by the app on startup
+usage_recorder = UsageRecorder()
+
+def _upstream_http_error(e: Exception) -> HTTPException:
+    """
+    Convert a failed upstream call into an HTTP error, keeping the upstream
+    status (and Retry-After while the circuit is open) where it is known
+    """
+    return HTTPException(status_code=getattr(e, 'status_code', 500), detail=str(e), headers=getattr(e, 'headers', None))
+
+def _request_bytes(http_request: Request) -> int:
+    length = http_request.headers.get("content-length", "")
+    return int(length) if length.isdigit() else 0
+
+def _record_usage(
+    api_key: str,
+    endpoint: str,
+    model: str,
+    started: float,
+    usage: Optional[Dict] = None,
+    bytes_in: int = 0,
+    bytes_out: int = 0,
+    error: Optional[Exception] = None
+) -> None:
+    status = getattr(error, 'status_code', 500) if error is not None else 200
+    usage_recorder.record(api_key_hash(api_key), endpoint, model, time.perf_counter() - started, usage, bytes_in, bytes_out, status)
 
 class ChatRequest(BaseModel):
     model: str
     messages: List[Dict[str, str]]
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = 1000
+    stream: Optional[bool] = False
+
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
+    concurrency: Optional[int] = Field(None, ge=1)
 
 class ImageRequest(BaseModel):
     model: str
@@ -24,11 +78,14 @@ class AudioGenerationRequest(BaseModel):
     model: str
     input: str
     voice: Optional[str] = "alloy"
+    stream: Optional[bool] = False
 
 @router.post("/playground/text")
 async def text_completion(
     request: ChatRequest,
-    x_api_key: Optional[str] = Header(None)
+    http_request: Request,
+    x_api_key: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
 ):
     """
     Process text completion using a4f API
@@ -36,23 +93,180 @@ async def text_completion(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required. Please add your a4f.co API key.")
     
+    if request.stream:
+        return await _stream_text_completion(a4f_service, request, x_api_key, _request_bytes(http_request))
+    
+    started = time.perf_counter()
     try:
-        result = a4f_service.chat_completion(
-            api_key=x_api_key,
+        result, cache_status = await _complete_chat(a4f_service, request, x_api_key)
+    except HTTPException as e:
+        _record_usage(x_api_key, "chat/completions", request.model, started, bytes_in=_request_bytes(http_request), error=e)
+        raise
+    except Exception as e:
+        logger.error(f"Text completion error: {str(e)}")
+        _record_usage(x_api_key, "chat/completions", request.model, started, bytes_in=_request_bytes(http_request), error=e)
+        raise _upstream_http_error(e)
+    
+    body = APIJSONResponse(result, headers={"X-Cache": cache_status})
+    # Cached answers did not spend upstream tokens
+    usage = result.get("usage") if cache_status != "HIT" else None
+    _record_usage(x_api_key, "chat/completions", request.model, started, usage, _request_bytes(http_request), len(body.body))
+    return body
+
+async def _complete_chat(a4f_service: A4FService, request: ChatRequest, api_key: str) -> Tuple[Dict, str]:
+    """
+    Run a non-streaming chat completion through the response cache;
+    returns the result and its X-Cache status
+    """
+    # Only temperature-0 completions are deterministic enough to cache
+    cache_key = None
+    if response_cache.enabled and request.temperature == 0:
+        cache_key = response_cache.make_key("chat", api_key, request.model_dump(exclude={"stream"}))
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached, "HIT"
+    
+    async with admission.slot(api_key_hash(api_key)):
+        result = await a4f_service.chat_completion(
+            api_key=api_key,
+            model=request.model,
+            messages=request.messages,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens
+        )
+    if cache_key:
+        response_cache.set(cache_key, result)
+    return result, "MISS" if cache_key else "BYPASS"
+
+@router.post("/playground/text/batch")
+async def text_completion_batch(
+    batch: BatchChatRequest,
+    x_api_key: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
+):
+    """
+    Run many text completions concurrently and stream results as NDJSON in completion order
+    """
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="API key required. Please add your a4f.co API key.")
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds the {BATCH_MAX_ITEMS} request limit")
+    
+    # Stay within the key's admission limit so items wait here rather than being rejected
+    semaphore = asyncio.Semaphore(min(batch.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY, admission.per_key_limit))
+    
+    async def run_one(position: int, item: ChatRequest) -> Dict:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result, cache_status = await _complete_chat(a4f_service, item, x_api_key)
+            except Exception as e:
+                logger.error(f"Batch text completion error at index {position}: {str(e)}")
+                _record_usage(x_api_key, "chat/completions", item.model, started, error=e)
+                return {"index": position, "status": getattr(e, 'status_code', 500), "error": str(e)}
+            _record_usage(x_api_key, "chat/completions", item.model, started, result.get("usage") if cache_status != "HIT" else None)
+            return {"index": position, "cache": cache_status, "result": result}
+    
+    async def results() -> AsyncIterator[bytes]:
+        tasks = [asyncio.create_task(run_one(position, item)) for position, item in enumerate(batch.requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                # Upstream results are embedded as their original bytes
+                yield dumps(line) + b"\n"
+        finally:
+            # Client went away or the stream failed: stop the remaining upstream calls
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+class _StreamCleanup:
+    """
+    Closes an upstream stream and frees its admission slot exactly once.
+    Runs from the relay generator and again as the response background task,
+    which covers clients that disconnect before the body starts.
+    """
+    
+    def __init__(self, stream: UpstreamStream, key_hash: str):
+        self.stream = stream
+        self.key_hash = key_hash
+        self.done = False
+    
+    async def __call__(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        try:
+            await self.stream.aclose()
+        finally:
+            admission.release(self.key_hash)
+
+async def _stream_text_completion(a4f_service: A4FService, request: ChatRequest, api_key: str, bytes_in: int = 0) -> StreamingResponse:
+    """
+    Proxy the upstream SSE stream chunk by chunk
+    """
+    started = time.perf_counter()
+    key_hash = api_key_hash(api_key)
+    await admission.acquire(key_hash)
+    try:
+        chunks = await a4f_service.chat_completion_stream(
+            api_key=api_key,
             model=request.model,
             messages=request.messages,
             temperature=request.temperature,
             max_tokens=request.max_tokens
         )
-        return result
     except Exception as e:
+        admission.release(key_hash)
         logger.error(f"Text completion error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        _record_usage(api_key, "chat/completions", request.model, started, bytes_in=bytes_in, error=e)
+        raise _upstream_http_error(e)
+    cleanup = _StreamCleanup(chunks, key_hash)
+    
+    async def relay() -> AsyncIterator[bytes]:
+        first_chunk_at = None
+        sent = 0
+        try:
+            async for chunk in chunks:
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                    logger.info(f"Text completion stream for {request.model}: time to first token {(first_chunk_at - started) * 1000:.1f} ms")
+                sent += len(chunk)
+                yield chunk
+        except asyncio.CancelledError:
+            logger.info(f"Text completion stream for {request.model} cancelled by client after {sent} bytes")
+            raise
+        finally:
+            # Releases the upstream connection and admission slot, also on disconnect
+            await cleanup()
+            # Token counts are not parsed out of the event stream
+            _record_usage(api_key, "chat/completions", request.model, started, bytes_in=bytes_in, bytes_out=sent)
+    
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(cleanup)
+    )
+
+async def _offload_images(result: Dict, http_request: Request) -> Dict:
+    """
+    Swap base64 images for absolute URLs into the image store when offload is enabled.
+    The response cache keeps the upstream result, so a hit re-stores any blob the
+    store has evicted since and never points at a missing image.
+    """
+    if not IMAGE_OFFLOAD_ENABLED:
+        return result
+    url_prefix = str(http_request.base_url).rstrip('/') + IMAGE_URL_PREFIX
+    return await image_store.offload(result, url_prefix)
 
 @router.post("/playground/image")
 async def image_generation(
     request: ImageRequest,
-    x_api_key: Optional[str] = Header(None)
+    http_request: Request,
+    x_api_key: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
 ):
     """
     Generate image using a4f API
@@ -60,24 +274,65 @@ async def image_generation(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required. Please add your a4f.co API key.")
     
+    started = time.perf_counter()
+    cache_key = None
+    if response_cache.enabled:
+        cache_key = response_cache.make_key("image", x_api_key, request.model_dump())
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            body = APIJSONResponse(await _offload_images(cached, http_request), headers={"X-Cache": "HIT"})
+            _record_usage(x_api_key, "images/generations", request.model, started, bytes_in=_request_bytes(http_request), bytes_out=len(body.body))
+            return body
+    
     try:
-        result = a4f_service.image_generation(
-            api_key=x_api_key,
-            model=request.model,
-            prompt=request.prompt,
-            size=request.size,
-            n=request.n
-        )
-        return result
+        async with admission.slot(api_key_hash(x_api_key)):
+            result = await a4f_service.image_generation(
+                api_key=x_api_key,
+                model=request.model,
+                prompt=request.prompt,
+                size=request.size,
+                n=request.n
+            )
+        if cache_key:
+            response_cache.set(cache_key, result)
+        result = await _offload_images(result, http_request)
+    except HTTPException as e:
+        _record_usage(x_api_key, "images/generations", request.model, started, bytes_in=_request_bytes(http_request), error=e)
+        raise
     except Exception as e:
         logger.error(f"Image generation error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        _record_usage(x_api_key, "images/generations", request.model, started, bytes_in=_request_bytes(http_request), error=e)
+        raise _upstream_http_error(e)
+    
+    body = APIJSONResponse(result, headers={"X-Cache": "MISS" if cache_key else "BYPASS"})
+    _record_usage(x_api_key, "images/generations", request.model, started, result.get("usage"), _request_bytes(http_request), len(body.body))
+    return body
+
+@router.get("/playground/images/{digest}")
+async def get_generated_image(
+    digest: str = Path(..., pattern=r"^[0-9a-f]{64}$"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Serve an offloaded image by its sha256 digest, with HTTP range support
+    """
+    entry = image_store.get(digest)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    headers = {"ETag": f'"{digest}"', "Cache-Control": IMAGE_CACHE_CONTROL}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    path, media_type = entry
+    return ranged_file_response(path, media_type, range_header=range_header, headers=headers)
 
 @router.post("/playground/audio/transcribe")
 async def audio_transcription(
     file: UploadFile = File(...),
     model: str = "whisper-1",
-    x_api_key: Optional[str] = Header(None)
+    x_api_key: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
 ):
     """
     Transcribe audio using a4f API
@@ -85,22 +340,38 @@ async def audio_transcription(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required. Please add your a4f.co API key.")
     
+    size = file.size if file.size is not None else upload_size(file.file)
+    if size > MAX_UPLOAD_BYTES:
+        upload_tracker.rejected += 1
+        raise HTTPException(status_code=413, detail=f"Audio file exceeds the {MAX_UPLOAD_BYTES} byte limit")
+    
+    started = time.perf_counter()
     try:
-        file_data = await file.read()
-        result = a4f_service.audio_transcription(
-            api_key=x_api_key,
-            model=model,
-            file_data=(file.filename, file_data, file.content_type)
-        )
+        # Hand the spooled file itself to the multipart encoder so it is sent in chunks
+        await file.seek(0)
+        async with admission.slot(api_key_hash(x_api_key)):
+            with upload_tracker.track(size, resident_bytes(file.file, size)):
+                result = await a4f_service.audio_transcription(
+                    api_key=x_api_key,
+                    model=model,
+                    file_data=(file.filename, file.file, file.content_type)
+                )
+        _record_usage(x_api_key, "audio/transcriptions", model, started, result.get("usage"), bytes_in=size)
         return result
+    except HTTPException as e:
+        _record_usage(x_api_key, "audio/transcriptions", model, started, bytes_in=size, error=e)
+        raise
     except Exception as e:
         logger.error(f"Audio transcription error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        _record_usage(x_api_key, "audio/transcriptions", model, started, bytes_in=size, error=e)
+        raise _upstream_http_error(e)
 
 @router.post("/playground/audio/generate")
 async def audio_generation(
     request: AudioGenerationRequest,
-    x_api_key: Optional[str] = Header(None)
+    http_request: Request,
+    x_api_key: Optional[str] = Header(None),
+    a4f_service: A4FService = Depends(get_a4f_service)
 ):
     """
     Generate audio using a4f API
@@ -108,16 +379,89 @@ async def audio_generation(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required. Please add your a4f.co API key.")
     
+    if request.stream:
+        return await _stream_audio_generation(a4f_service, request, x_api_key, _request_bytes(http_request))
+    
+    started = time.perf_counter()
+    try:
+        async with admission.slot(api_key_hash(x_api_key)):
+            audio_data = await a4f_service.audio_generation(
+                api_key=x_api_key,
+                model=request.model,
+                input_text=request.input,
+                voice=request.voice
+            )
+        
+        _record_usage(x_api_key, "audio/speech", request.model, started, bytes_in=_request_bytes(http_request), bytes_out=len(audio_data))
+        return Response(content=audio_data, media_type="audio/mpeg")
+    except HTTPException as e:
+        _record_usage(x_api_key, "audio/speech", request.model, started, bytes_in=_request_bytes(http_request), error=e)
+        raise
+    except Exception as e:
+        logger.error(f"Audio generation error: {str(e)}")
+        _record_usage(x_api_key, "audio/speech", request.model, started, bytes_in=_request_bytes(http_request), error=e)
+        raise _upstream_http_error(e)
+
+async def _stream_audio_generation(a4f_service: A4FService, request: AudioGenerationRequest, api_key: str, bytes_in: int = 0) -> StreamingResponse:
+    """
+    Forward upstream audio as it arrives while spooling it to disk for later range requests
+    """
+    started = time.perf_counter()
+    key_hash = api_key_hash(api_key)
+    await admission.acquire(key_hash)
     try:
-        audio_data = a4f_service.audio_generation(
-            api_key=x_api_key,
+        chunks = await a4f_service.audio_generation_stream(
+            api_key=api_key,
             model=request.model,
             input_text=request.input,
             voice=request.voice
         )
-        
-        from fastapi.responses import Response
-        return Response(content=audio_data, media_type="audio/mpeg")
     except Exception as e:
+        admission.release(key_hash)
         logger.error(f"Audio generation error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        _record_usage(api_key, "audio/speech", request.model, started, bytes_in=bytes_in, error=e)
+        raise _upstream_http_error(e)
+    cleanup = _StreamCleanup(chunks, key_hash)
+    media_type = chunks.media_type
+    
+    audio_id = audio_store.new_id()
+    
+    async def relay() -> AsyncIterator[bytes]:
+        completed = False
+        sent = 0
+        try:
+            async with await audio_store.open_writer(audio_id) as spool:
+                async for chunk in chunks:
+                    await spool.write(chunk)
+                    sent += len(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            await cleanup()
+            _record_usage(api_key, "audio/speech", request.model, started, bytes_in=bytes_in, bytes_out=sent)
+            if completed:
+                audio_store.commit(audio_id, media_type)
+            else:
+                audio_store.discard(audio_id)
+    
+    return StreamingResponse(
+        relay(),
+        media_type=media_type,
+        headers={"Content-Location": f"/api/playground/audio/{audio_id}", "X-Audio-Id": audio_id},
+        background=BackgroundTask(cleanup)
+    )
+
+@router.get("/playground/audio/{audio_id}")
+async def get_generated_audio(
+    audio_id: str = Path(..., pattern=r"^[0-9a-f]{32}$"),
+    range_header: Optional[str] = Header(None, alias="Range")
+):
+    """
+    Serve a previously streamed audio clip, with HTTP range support
+    """
+    entry = audio_store.get(audio_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    path, media_type = entry
+    return ranged_file_response(path, media_type, range_header=range_header)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from routes import playground, usage
+from services.a4f_service import get_a4f_service, resilience, single_flight
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_stats():
+    """
+    Report in-process cache and upstream traffic counters
+    """
+    return {
+        "catalog_cache": get_a4f_service().catalog.stats(),
+        "uploads": playground.upload_tracker.stats(),
+        "image_store": playground.image_store.stats(),
+        "single_flight": single_flight.stats(),
+        "response_cache": playground.response_cache.stats(),
+        "admission": playground.admission.stats(),
+        "usage": playground.usage_recorder.stats(),
+        "usage_rollups": usage.usage_rollups.stats(),
+        "resilience": resilience.stats(),
+    }
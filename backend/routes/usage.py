@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, Header, Query
+from datetime import datetime, timezone
+from typing import Optional
+from pymongo.errors import PyMongoError
+from routes import playground
+from services.fingerprint import api_key_hash
+from services.usage_rollups import UsageRollupStore, default_window
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# Attached to the database by the app, which feeds it flushed usage batches
+usage_rollups = UsageRollupStore()
+
+@router.get("/usage")
+async def get_usage(x_api_key: Optional[str] = Header(None)):
+    """
+    Summarize playground usage since startup; with an API key, also that key's usage
+    """
+    key_hash = api_key_hash(x_api_key) if x_api_key else None
+    return playground.usage_recorder.summary(key_hash)
+
+@router.get("/usage/rollups")
+async def get_usage_rollups(
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[str] = Query("model", pattern="^(model|endpoint|none)$"),
+    model: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None)
+):
+    """
+    Usage totals per hour or day from the rollup collections, optionally per
+    model or endpoint; with an API key, only that key's usage
+    """
+    if not usage_rollups.attached:
+        raise HTTPException(status_code=503, detail="Usage rollups are not available")
+    
+    # Timestamps without an offset are taken as UTC
+    if end is not None and end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start is not None and start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = end or datetime.now(timezone.utc)
+    start = start or end - default_window(granularity)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    try:
+        rows = await usage_rollups.query(
+            granularity,
+            start,
+            end,
+            group_by=None if group_by == "none" else group_by,
+            model=model,
+            endpoint=endpoint,
+            key_hash=api_key_hash(x_api_key) if x_api_key else None
+        )
+        return {"granularity": granularity, "start": start.isoformat(), "end": end.isoformat(), "rows": rows}
+    except PyMongoError as e:
+        # Database errors carry topology and server details that clients should not see
+        logger.error(f"Usage rollup query error: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=503, detail="Usage database is unavailable, please retry")
+    except Exception as e:
+        logger.error(f"Usage rollup query error: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Usage rollup query failed")
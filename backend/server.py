@@ -2,23 +2,101 @@ from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
+import time
 from pathlib import Path
-
-# Import route modules
-from routes import models, playground
+from typing import Callable, List
 
 ROOT_DIR = Path(__file__).parent
+# Services read their settings from the environment at import time, so
+# .env must be loaded before any route or service module is imported
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Import route modules
+from routes import metrics, models, playground, stats, usage
+from services.a4f_service import CATALOG_REFRESH_INTERVAL, get_a4f_service, open_http_client, close_http_client
+from services.json_codec import APIJSONResponse
+from services.metrics import MetricsMiddleware
+from services.catalog_store import CatalogSnapshotStore
+from services.usage import USAGE_SHUTDOWN_FLUSH_TIMEOUT
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def _start_catalog_refresher(catalog_store: CatalogSnapshotStore, listeners: List[Callable]) -> asyncio.Task:
+    """
+    Start the catalog refresh task; the refresh listeners it registers are
+    appended to `listeners` so shutdown can remove them again
+    """
+    catalog = get_a4f_service().catalog
+    # Serve the last persisted catalog right away; the refresher updates it in the background
+    await catalog_store.restore(catalog)
+    listeners.append(catalog_store.save)
+    # Setting a path turns on cross-worker sharing: one worker refreshes, the others read its snapshot
+    shared_path = os.environ.get('CATALOG_SHARED_PATH')
+    if shared_path:
+        # Imported only when configured, so single-process deployments skip it
+        from services.shared_catalog import SharedCatalog
+        shared = SharedCatalog(shared_path)
+        listeners.append(shared.publish)
+        task = asyncio.create_task(shared.run(catalog, CATALOG_REFRESH_INTERVAL))
+    else:
+        task = asyncio.create_task(catalog.run_refresher())
+    for listener in listeners:
+        catalog.add_listener(listener)
+    return task
+
+async def _stop(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await open_http_client()
+    
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    app.state.db = db
+    playground.usage_recorder.attach(db)
+    usage.usage_rollups.attach(db)
+    # Rollups are updated from each flushed batch rather than by scanning raw events.
+    # The recorder and catalog are process-wide, so every listener added here is
+    # removed on shutdown; otherwise each lifespan run (tests, reloads) stacks another
+    playground.usage_recorder.add_listener(usage.usage_rollups.apply)
+    
+    catalog = get_a4f_service().catalog
+    catalog_listeners: List[Callable] = []
+    catalog_refresher = await _start_catalog_refresher(CatalogSnapshotStore(db), catalog_listeners)
+    usage_flusher = asyncio.create_task(playground.usage_recorder.run())
+    logger.info(f"Startup completed in {(time.perf_counter() - started) * 1000:.1f} ms")
+    try:
+        yield
+    finally:
+        # An in-flight refresh or snapshot save must stop before the clients close
+        await _stop(catalog_refresher)
+        for listener in catalog_listeners:
+            catalog.remove_listener(listener)
+        await catalog.shutdown(USAGE_SHUTDOWN_FLUSH_TIMEOUT)
+        await close_http_client()
+        # Cancelling runs a final flush, which must finish before the client closes
+        await _stop(usage_flusher)
+        playground.usage_recorder.remove_listener(usage.usage_rollups.apply)
+        client.close()
 
 # Create the main app without a prefix
-app = FastAPI(title="AI Models Hub API", version="1.0.0")
+app = FastAPI(title="AI Models Hub API", version="1.0.0", lifespan=lifespan, default_response_class=APIJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -31,6 +109,9 @@ async def root():
 # Include feature routers
 api_router.include_router(models.router, tags=["Models"])
 api_router.include_router(playground.router, tags=["Playground"])
+api_router.include_router(stats.router, tags=["Stats"])
+api_router.include_router(metrics.router, tags=["Stats"])
+api_router.include_router(usage.router, tags=["Usage"])
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -42,14 +123,5 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# Outermost, so its timings include CORS handling
+app.add_middleware(MetricsMiddleware)
@@ -1,27 +1,364 @@
-import requests
+import httpx
+import asyncio
 import os
-from typing import List, Dict, Optional
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Set
 import logging
+from fastapi import HTTPException
+from services.catalog_index import CatalogIndex, TIERS, catalog_etag
+from services.metrics import upstream_timer
+from services.fingerprint import api_key_hash, canonical_hash
+from services.json_codec import loads, loads_raw
+from services.resilience import Resilience, UpstreamError, passthrough_status
+from services.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
-A4F_API_BASE = "https://api.a4f.co/v1"
-A4F_DISPLAY_API = "https://www.a4f.co/api"
+# Overridable so the benchmarks can point the app at a local stub
+A4F_API_BASE = os.environ.get('A4F_API_BASE', 'https://api.a4f.co/v1')
+A4F_DISPLAY_API = os.environ.get('A4F_DISPLAY_API', 'https://www.a4f.co/api')
+
+# Catalog cache settings. Entries older than the TTL are still served while a
+# refresh runs in the background (stale-while-revalidate).
+CATALOG_TTL_SECONDS = float(os.environ.get('CATALOG_TTL_SECONDS', '300'))
+CATALOG_REFRESH_INTERVAL = float(os.environ.get('CATALOG_REFRESH_INTERVAL', str(CATALOG_TTL_SECONDS / 2)))
+# Retry-After sent while no catalog could be loaded yet
+CATALOG_RETRY_AFTER = int(os.environ.get('CATALOG_RETRY_AFTER', '5'))
+
+# Upstream connection pool limits, shared by every A4FService in the process
+A4F_MAX_CONNECTIONS = int(os.environ.get('A4F_MAX_CONNECTIONS', '500'))
+A4F_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('A4F_MAX_KEEPALIVE_CONNECTIONS', '100'))
+A4F_KEEPALIVE_EXPIRY = float(os.environ.get('A4F_KEEPALIVE_EXPIRY', '30'))
+A4F_POOL_TIMEOUT = float(os.environ.get('A4F_POOL_TIMEOUT', '10'))
+# Read size for streamed upstream bodies; bounds per-request buffering
+A4F_STREAM_CHUNK_SIZE = int(os.environ.get('A4F_STREAM_CHUNK_SIZE', str(64 * 1024)))
+
+# Upper bound for a single tier fetch during a catalog load
+A4F_TIER_TIMEOUT = float(os.environ.get('A4F_TIER_TIMEOUT', '10'))
+
+_http_client: Optional[httpx.AsyncClient] = None
+_service: Optional["A4FService"] = None
+
+# Identical concurrent upstream calls from any A4FService share one request
+single_flight = SingleFlight()
+# Retries, hedging and circuit breakers for every upstream endpoint
+resilience = Resilience()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide keep-alive HTTP client, creating it on first use
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http1=True,
+            http2=False,
+            limits=httpx.Limits(
+                max_connections=A4F_MAX_CONNECTIONS,
+                max_keepalive_connections=A4F_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=A4F_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(60, pool=A4F_POOL_TIMEOUT),
+        )
+    return _http_client
+
+
+async def open_http_client() -> None:
+    """
+    Create the shared HTTP client on application startup
+    """
+    get_http_client()
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared HTTP client and its pooled connections on shutdown
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class UpstreamStream:
+    """
+    An upstream response whose body is read chunk by chunk as it arrives.
+    aclose() releases the connection and is safe to call more than once,
+    including when iteration never started.
+    """
+
+    def __init__(self, response: httpx.Response, chunk_size: Optional[int] = None):
+        self._response = response
+        self._chunk_size = chunk_size
+
+    @property
+    def media_type(self) -> str:
+        return self._response.headers.get("content-type", "application/octet-stream")
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._response.aiter_bytes(self._chunk_size)
+
+    async def aclose(self) -> None:
+        await self._response.aclose()
+
+
+class CatalogUnavailable(HTTPException):
+    def __init__(self, failed_tiers: List[str], retry_after: int = CATALOG_RETRY_AFTER):
+        detail = "Model catalog is not available yet, please retry"
+        if failed_tiers:
+            detail += f" (failed tiers: {', '.join(failed_tiers)})"
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class CatalogCache:
+    """
+    In-process cache for the model catalog with stale-while-revalidate refresh
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Dict]], ttl: float = CATALOG_TTL_SECONDS):
+        self._loader = loader
+        self.ttl = ttl
+        self._models: Optional[List[Dict]] = None
+        self.index = CatalogIndex([])
+        self.failed_tiers: List[str] = []
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[CatalogIndex], Awaitable[None]]] = []
+        self._listener_tasks: Set[asyncio.Task] = set()
+        # Cleared on workers that receive the catalog from another process
+        self.background_refresh = True
+        # How long a cold cache waits for a catalog from elsewhere before loading it itself
+        self.cold_wait = 0.0
+        self._installed = asyncio.Event()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @property
+    def age(self) -> Optional[float]:
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def is_stale(self) -> bool:
+        age = self.age
+        return age is None or age > self.ttl
+
+    async def get(self) -> List[Dict]:
+        """
+        Return the cached catalog, loading it on first use only
+        """
+        return (await self.get_index()).models
+
+    async def get_index(self) -> CatalogIndex:
+        """
+        Return the lookup index for the cached catalog; raises CatalogUnavailable
+        while no catalog could be loaded yet
+        """
+        if self._models is None:
+            self.misses += 1
+            if self.cold_wait > 0:
+                try:
+                    await asyncio.wait_for(self._installed.wait(), self.cold_wait)
+                except asyncio.TimeoutError:
+                    logger.warning(f"No catalog received within {self.cold_wait:.0f}s, loading it from upstream")
+            if self._models is None:
+                await self.refresh()
+            if self._models is None:
+                # Never answer with an empty catalog that clients would cache
+                raise CatalogUnavailable(self.failed_tiers)
+            return self.index
+
+        if self.is_stale():
+            self.stale_hits += 1
+            if self.background_refresh:
+                self._schedule_refresh()
+        else:
+            self.hits += 1
+        return self.index
+
+    async def refresh(self) -> None:
+        """
+        Reload the catalog from upstream; concurrent callers share one load
+        """
+        started = self._fetched_at
+        async with self._lock:
+            # Another caller finished a refresh while we were waiting
+            if self._fetched_at != started and self._models is not None:
+                return
+            try:
+                catalog = await self._loader()
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.error(f"Catalog refresh failed: {str(e)}")
+                return
+
+            self.refreshes += 1
+            models = catalog.get('models', [])
+            failed_tiers = catalog.get('failed_tiers', [])
+            if not models and (self._models or failed_tiers):
+                self.refresh_errors += 1
+                if self._models:
+                    # Upstream returned nothing; keep serving the last good catalog
+                    logger.warning("Catalog refresh returned no models, keeping previous catalog")
+                else:
+                    # Nothing cached yet: leave the cache cold so the next request retries the load
+                    logger.warning(f"Catalog load returned no models, failed tiers: {failed_tiers}")
+                    self.failed_tiers = failed_tiers
+                return
+            if failed_tiers and self._models:
+                models = self._merge_failed_tiers(models, failed_tiers)
+            await self._install(models, failed_tiers, time.monotonic())
+            self._notify_listeners()
+
+    async def prime(self, models: List[Dict], failed_tiers: List[str], age: float) -> None:
+        """
+        Seed the cache from a persisted snapshot that is `age` seconds old.
+        A snapshot older than the TTL is served stale until the next refresh.
+        """
+        async with self._lock:
+            if self._models is not None:
+                return
+            await self._install(models, failed_tiers, time.monotonic() - max(age, 0.0))
+
+    async def replace(self, models: List[Dict], failed_tiers: List[str], age: float, bodies=None) -> None:
+        """
+        Install a catalog produced elsewhere (e.g. by another worker) as the
+        current one, optionally with its precomputed response bodies
+        """
+        async with self._lock:
+            await self._install(models, failed_tiers, time.monotonic() - max(age, 0.0), bodies)
+
+    def touch(self, age: float) -> None:
+        """
+        Mark the current catalog as confirmed unchanged `age` seconds ago
+        """
+        self._fetched_at = time.monotonic() - max(age, 0.0)
+
+    async def _install(self, models: List[Dict], failed_tiers: List[str], fetched_at: float, bodies=None) -> None:
+        # Indexing, hashing and compression are CPU bound; keep them off the event loop
+        etag = await asyncio.to_thread(catalog_etag, models, failed_tiers)
+        if self._models is not None and etag == self.index.etag:
+            # Same content as the installed catalog: keep its index, only renew its age
+            self.touch(time.monotonic() - fetched_at)
+            return
+        self.index = await asyncio.to_thread(CatalogIndex, models, failed_tiers, etag, bodies)
+        self._models = models
+        self.failed_tiers = failed_tiers
+        self._fetched_at = fetched_at
+        self._installed.set()
+
+    def add_listener(self, listener: Callable[[CatalogIndex], Awaitable[None]]) -> None:
+        """
+        Register a coroutine called with the new index after each successful refresh
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[CatalogIndex], Awaitable[None]]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify_listeners(self) -> None:
+        for listener in self._listeners:
+            task = asyncio.create_task(listener(self.index))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_done)
+
+    def _listener_done(self, task: asyncio.Task) -> None:
+        self._listener_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Catalog refresh listener failed: {str(task.exception())}")
+
+    async def shutdown(self, timeout: float) -> None:
+        """
+        Cancel a scheduled background refresh and wait up to `timeout` seconds
+        for running listeners (e.g. a snapshot save), cancelling the rest
+        """
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            await asyncio.wait({self._refresh_task})
+        if not self._listener_tasks:
+            return
+        _, pending = await asyncio.wait(set(self._listener_tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+    def _merge_failed_tiers(self, models: List[Dict], failed_tiers: List[str]) -> List[Dict]:
+        """
+        Carry over the previous models of tiers that failed to refresh
+        """
+        by_tier = {tier: [] for tier in TIERS}
+        for model in models:
+            by_tier.setdefault(model.get('tier'), []).append(model)
+        for model in self._models:
+            if model.get('tier') in failed_tiers:
+                by_tier[model['tier']].append(model)
+        return [model for tier_models in by_tier.values() for model in tier_models]
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def run_refresher(self, interval: float = CATALOG_REFRESH_INTERVAL) -> None:
+        """
+        Keep the catalog warm; meant to run as a background task for the process lifetime
+        """
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict:
+        age = self.age
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "ttl_seconds": self.ttl,
+            "model_count": len(self._models) if self._models is not None else 0,
+            "failed_tiers": self.failed_tiers,
+        }
+
 
 class A4FService:
     def __init__(self):
         self.base_url = A4F_API_BASE
         self.display_api = A4F_DISPLAY_API
+        self.catalog = CatalogCache(self.get_catalog)
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_http_client()
     
-    def get_display_models(self, plan: str = "free") -> Dict:
+    async def _call(self, endpoint: str, model: str, send: Callable[[], Awaitable[httpx.Response]], **options) -> httpx.Response:
         """
-        Fetch models from a4f.co display API
+        Send an upstream request through the resilience layer, recording its latency
         """
-        try:
+        async with upstream_timer(endpoint, model) as timer:
+            response = await resilience.call(endpoint, send, **options)
+            timer.status = response.status_code
+        return response
+    
+    async def _fetch_display_models(self, plan: str) -> Dict:
+        async def fetch() -> Dict:
             url = f"{self.display_api}/get-display-models?plan={plan}"
-            response = requests.get(url, timeout=10)
+            response = await self._call(
+                "get-display-models",
+                "",
+                lambda: self.client.get(url, timeout=httpx.Timeout(A4F_TIER_TIMEOUT, pool=A4F_POOL_TIMEOUT)),
+                idempotent=True,
+                hedge=True
+            )
             response.raise_for_status()
-            data = response.json()
+            data = loads(response.content)
             
             # Categorize models
             if 'models' in data:
@@ -30,23 +367,35 @@ class A4FService:
                     model['tier'] = plan
             
             return data
-        except Exception as e:
-            logger.error(f"Error fetching models: {str(e)}")
-            return {"models": []}
+        
+        return await single_flight.do(("get-display-models", plan), fetch)
     
-    def get_all_models(self) -> List[Dict]:
+    async def get_catalog(self) -> Dict:
         """
-        Fetch models from all tiers
+        Fetch models from all tiers concurrently, returning partial results
+        together with the tiers that failed
         """
-        all_models = []
-        tiers = ['free', 'basic', 'pro', 'ultra']
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._fetch_display_models(tier), A4F_TIER_TIMEOUT) for tier in TIERS),
+            return_exceptions=True
+        )
         
-        for tier in tiers:
-            data = self.get_display_models(tier)
-            if 'models' in data:
-                all_models.extend(data['models'])
+        all_models = []
+        failed_tiers = []
+        for tier, result in zip(TIERS, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error fetching {tier} models: {type(result).__name__}: {str(result)}")
+                failed_tiers.append(tier)
+                continue
+            all_models.extend(result.get('models', []))
         
-        return all_models
+        return {"models": all_models, "failed_tiers": failed_tiers}
+    
+    async def get_catalog_index(self) -> CatalogIndex:
+        """
+        Fetch the lookup index for the cached catalog
+        """
+        return await self.catalog.get_index()
     
     def _categorize_model(self, model_type: str) -> str:
         """
@@ -74,7 +423,7 @@ class A4FService:
         else:
             return 'chat_completion'  # Default to chat completion
     
-    def chat_completion(self, api_key: str, model: str, messages: List[Dict], **kwargs) -> Dict:
+    async def chat_completion(self, api_key: str, model: str, messages: List[Dict], **kwargs) -> Dict:
         """
         Make chat completion request to a4f API
         """
@@ -91,14 +440,75 @@ class A4FService:
                 **kwargs
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self._post_coalesced("chat/completions", api_key, url, headers, payload, timeout=60)
+        except httpx.HTTPError as e:
             logger.error(f"Chat completion error: {str(e)}")
-            raise Exception(f"API request failed: {str(e)}")
+            raise UpstreamError.from_httpx(e)
     
-    def image_generation(self, api_key: str, model: str, prompt: str, **kwargs) -> Dict:
+    async def _post_coalesced(self, endpoint: str, api_key: str, url: str, headers: Dict, payload: Dict, timeout: float, raw: bool = False):
+        """
+        POST a JSON payload, sharing one upstream request between identical
+        concurrent callers (same endpoint, payload and API key)
+        """
+        async def send():
+            response = await self._call(
+                endpoint,
+                payload.get("model", ""),
+                lambda: self.client.post(url, headers=headers, json=payload, timeout=httpx.Timeout(timeout, pool=A4F_POOL_TIMEOUT))
+            )
+            response.raise_for_status()
+            # JSON results keep their bytes so routes can pass them through untouched
+            return response.content if raw else loads_raw(response.content)
+        
+        key = (endpoint, canonical_hash(payload), api_key_hash(api_key))
+        return await single_flight.do(key, send)
+    
+    async def chat_completion_stream(self, api_key: str, model: str, messages: List[Dict], **kwargs) -> "UpstreamStream":
+        """
+        Open a streaming chat completion over the raw SSE bytes
+        """
+        url = f"{self.base_url}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        
+        payload = {
+            "model": model,
+            "messages": messages,
+            **kwargs,
+            "stream": True
+        }
+        
+        response = await self._open_stream("chat/completions", url, headers, payload, timeout=60)
+        return UpstreamStream(response)
+    
+    async def _open_stream(self, endpoint: str, url: str, headers: Dict, payload: Dict, timeout: float) -> httpx.Response:
+        """
+        Send a POST and return the response with its body still unread
+        """
+        def send() -> Awaitable[httpx.Response]:
+            request = self.client.build_request(
+                "POST", url, headers=headers, json=payload,
+                timeout=httpx.Timeout(timeout, pool=A4F_POOL_TIMEOUT)
+            )
+            return self.client.send(request, stream=True)
+        
+        try:
+            response = await self._call(endpoint, payload.get("model", ""), send)
+        except httpx.HTTPError as e:
+            logger.error(f"Streaming request error: {str(e)}")
+            raise UpstreamError.from_httpx(e)
+        
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            logger.error(f"Streaming request error: {response.status_code} {response.text}")
+            raise UpstreamError(f"API request failed: {response.status_code} {response.text}", status_code=passthrough_status(response.status_code))
+        return response
+    
+    async def image_generation(self, api_key: str, model: str, prompt: str, **kwargs) -> Dict:
         """
         Make image generation request to a4f API
         """
@@ -115,14 +525,12 @@ class A4FService:
                 **kwargs
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=120)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self._post_coalesced("images/generations", api_key, url, headers, payload, timeout=120)
+        except httpx.HTTPError as e:
             logger.error(f"Image generation error: {str(e)}")
-            raise Exception(f"API request failed: {str(e)}")
+            raise UpstreamError.from_httpx(e)
     
-    def audio_transcription(self, api_key: str, model: str, file_data, **kwargs) -> Dict:
+    async def audio_transcription(self, api_key: str, model: str, file_data, **kwargs) -> Dict:
         """
         Make audio transcription request to a4f API
         """
@@ -138,14 +546,20 @@ class A4FService:
                 **kwargs
             }
             
-            response = requests.post(url, headers=headers, files=files, data=data, timeout=120)
+            # The upload stream may already be partly consumed, so never resend it
+            response = await self._call(
+                "audio/transcriptions",
+                model,
+                lambda: self.client.post(url, headers=headers, files=files, data=data, timeout=httpx.Timeout(120, pool=A4F_POOL_TIMEOUT)),
+                retry=False
+            )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return loads_raw(response.content)
+        except httpx.HTTPError as e:
             logger.error(f"Audio transcription error: {str(e)}")
-            raise Exception(f"API request failed: {str(e)}")
+            raise UpstreamError.from_httpx(e)
     
-    def audio_generation(self, api_key: str, model: str, input_text: str, **kwargs) -> bytes:
+    async def audio_generation(self, api_key: str, model: str, input_text: str, **kwargs) -> bytes:
         """
         Make audio generation request to a4f API
         """
@@ -162,9 +576,37 @@ class A4FService:
                 **kwargs
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=120)
-            response.raise_for_status()
-            return response.content
-        except requests.exceptions.RequestException as e:
+            return await self._post_coalesced("audio/speech", api_key, url, headers, payload, timeout=120, raw=True)
+        except httpx.HTTPError as e:
             logger.error(f"Audio generation error: {str(e)}")
-            raise Exception(f"API request failed: {str(e)}")
\ No newline at end of file
+            raise UpstreamError.from_httpx(e)
+    
+    async def audio_generation_stream(self, api_key: str, model: str, input_text: str, **kwargs) -> "UpstreamStream":
+        """
+        Open a streaming audio generation request
+        """
+        url = f"{self.base_url}/audio/speech"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": model,
+            "input": input_text,
+            **kwargs
+        }
+        
+        response = await self._open_stream("audio/speech", url, headers, payload, timeout=120)
+        return UpstreamStream(response, A4F_STREAM_CHUNK_SIZE)
+
+
+def get_a4f_service() -> A4FService:
+    """
+    Return the process-wide A4FService, so every route shares one catalog
+    cache; used as a FastAPI dependency
+    """
+    global _service
+    if _service is None:
+        _service = A4FService()
+    return _service
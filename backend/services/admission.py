@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+from fastapi import HTTPException
+
+ADMISSION_PER_KEY_LIMIT = int(os.environ.get('ADMISSION_PER_KEY_LIMIT', '8'))
+ADMISSION_GLOBAL_LIMIT = int(os.environ.get('ADMISSION_GLOBAL_LIMIT', '256'))
+ADMISSION_PER_KEY_MAX_QUEUE = int(os.environ.get('ADMISSION_PER_KEY_MAX_QUEUE', '32'))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', '1024'))
+ADMISSION_MAX_WAIT = float(os.environ.get('ADMISSION_MAX_WAIT', '10'))
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', '1'))
+
+
+class AdmissionRejected(HTTPException):
+    def __init__(self, status_code: int, detail: str, retry_after: int = ADMISSION_RETRY_AFTER):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class AdmissionController:
+    """
+    Caps upstream calls in flight per API key and overall. Callers over a
+    cap wait in per-key queues that are served round-robin, so one busy key
+    cannot starve the others; callers that cannot be queued or wait too long
+    are rejected with 429 (their own key is saturated) or 503 (global overload).
+    """
+
+    def __init__(
+        self,
+        per_key_limit: int = ADMISSION_PER_KEY_LIMIT,
+        global_limit: int = ADMISSION_GLOBAL_LIMIT,
+        per_key_max_queue: int = ADMISSION_PER_KEY_MAX_QUEUE,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_wait: float = ADMISSION_MAX_WAIT
+    ):
+        self.per_key_limit = per_key_limit
+        self.global_limit = global_limit
+        self.per_key_max_queue = per_key_max_queue
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._active: Dict[str, int] = {}
+        self._global_active = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        # Keys with queued callers, in the order they will be served
+        self._rotation: Deque[str] = deque()
+        self._queued = 0
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected_key = 0
+        self.rejected_global = 0
+        self.timeouts = 0
+        self.peak_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _has_capacity(self, key: str) -> bool:
+        return self._global_active < self.global_limit and self._active.get(key, 0) < self.per_key_limit
+
+    def _grant(self, key: str) -> None:
+        self._active[key] = self._active.get(key, 0) + 1
+        self._global_active += 1
+        self.admitted += 1
+
+    async def acquire(self, key: str) -> None:
+        # Callers already waiting for this key go first
+        if not self._queues.get(key) and self._has_capacity(key):
+            self._grant(key)
+            return
+
+        key_saturated = self._active.get(key, 0) >= self.per_key_limit
+        queue = self._queues.setdefault(key, deque())
+        if len(queue) >= self.per_key_max_queue:
+            self.rejected_key += 1
+            raise AdmissionRejected(429, "Too many concurrent requests for this API key")
+        if self._queued >= self.max_queue:
+            self.rejected_global += 1
+            raise AdmissionRejected(503, "Server is at capacity, please retry")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        if key not in self._rotation:
+            self._rotation.append(key)
+        self._queued += 1
+        self.queued_total += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self._queued)
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up: hand the slot back
+                self.release(key)
+            else:
+                waiter.cancel()
+                self._drop_waiter(key, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timeouts += 1
+            if key_saturated or self._active.get(key, 0) >= self.per_key_limit:
+                self.rejected_key += 1
+                raise AdmissionRejected(429, "Too many concurrent requests for this API key")
+            self.rejected_global += 1
+            raise AdmissionRejected(503, "Server is at capacity, please retry")
+        finally:
+            waited = time.monotonic() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _drop_waiter(self, key: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[key]
+
+    def release(self, key: str) -> None:
+        remaining = self._active.get(key, 0) - 1
+        if remaining > 0:
+            self._active[key] = remaining
+        else:
+            self._active.pop(key, None)
+        self._global_active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        Hand free slots to queued callers, one key at a time in rotation
+        """
+        skipped = 0
+        while self._rotation and skipped < len(self._rotation) and self._global_active < self.global_limit:
+            key = self._rotation.popleft()
+            queue = self._queues.get(key)
+            if not queue:
+                self._queues.pop(key, None)
+                continue
+            if not self._has_capacity(key):
+                self._rotation.append(key)
+                skipped += 1
+                continue
+
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._rotation.append(key)
+            else:
+                del self._queues[key]
+            if waiter.done():
+                continue
+            self._grant(key)
+            waiter.set_result(None)
+            skipped = 0
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def stats(self) -> Dict:
+        waits = self.queued_total
+        return {
+            "active": self._global_active,
+            "active_keys": len(self._active),
+            "queue_depth": self._queued,
+            "queued_keys": len(self._queues),
+            "peak_queue_depth": self.peak_queue_depth,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected_key": self.rejected_key,
+            "rejected_global": self.rejected_global,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": round(self.wait_seconds_total / waits, 4) if waits else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+            "per_key_limit": self.per_key_limit,
+            "global_limit": self.global_limit,
+        }
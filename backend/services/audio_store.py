@@ -0,0 +1,102 @@
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import anyio
+import logging
+
+logger = logging.getLogger(__name__)
+
+AUDIO_STORE_DIR = os.environ.get('AUDIO_STORE_DIR', os.path.join(tempfile.gettempdir(), 'a4f-audio'))
+# Number of generated clips kept on disk for range requests
+AUDIO_STORE_MAX_FILES = int(os.environ.get('AUDIO_STORE_MAX_FILES', '256'))
+
+_SIGNATURES = (
+    (b"ID3", "audio/mpeg"),
+    (b"OggS", "audio/ogg"),
+    (b"fLaC", "audio/flac"),
+)
+
+
+def sniff_audio_type(head: bytes) -> str:
+    """
+    Guess the media type of a clip from its first bytes; upstream defaults to MP3
+    """
+    for signature, media_type in _SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        return "audio/mp4"
+    return "audio/mpeg"
+
+
+class AudioStore:
+    """
+    Disk spool for streamed audio so finished clips can be re-read with range requests
+    """
+
+    def __init__(self, directory: str = AUDIO_STORE_DIR, max_files: int = AUDIO_STORE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+    def _path(self, audio_id: str) -> str:
+        return os.path.join(self.directory, f"{audio_id}.audio")
+
+    def new_id(self) -> str:
+        return uuid.uuid4().hex
+
+    async def open_writer(self, audio_id: str):
+        # The directory is created on first use rather than at import
+        os.makedirs(self.directory, exist_ok=True)
+        return await anyio.open_file(self._path(audio_id) + '.part', 'wb')
+
+    def commit(self, audio_id: str, media_type: str) -> None:
+        """
+        Publish a fully written clip and evict the oldest ones past the limit
+        """
+        path = self._path(audio_id)
+        os.replace(path + '.part', path)
+        self._register(audio_id, path, media_type)
+
+    def _register(self, audio_id: str, path: str, media_type: str) -> None:
+        self._entries[audio_id] = (path, media_type)
+        while len(self._entries) > self.max_files:
+            _, (old_path, _) = self._entries.popitem(last=False)
+            self._remove(old_path)
+
+    def discard(self, audio_id: str) -> None:
+        self._remove(self._path(audio_id) + '.part')
+
+    def get(self, audio_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Return (path, media type) of a finished clip. Clips written by another
+        worker sharing the directory are picked up from disk.
+        """
+        entry = self._entries.get(audio_id)
+        if entry is not None and os.path.exists(entry[0]):
+            return entry
+
+        path = self._path(audio_id)
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(12)
+        except FileNotFoundError:
+            self._entries.pop(audio_id, None)
+            return None
+        # The media type is not stored on disk, so sniff it from the file
+        media_type = sniff_audio_type(head)
+        self._register(audio_id, path, media_type)
+        return path, media_type
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove audio file {path}: {str(e)}")
@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+from services.json_codec import USE_ORJSON, dumps
+
+CATALOG_GZIP_LEVEL = int(os.environ.get('CATALOG_GZIP_LEVEL', '9'))
+CATALOG_BROTLI_QUALITY = int(os.environ.get('CATALOG_BROTLI_QUALITY', '9'))
+# Bodies smaller than this are only kept uncompressed
+CATALOG_MIN_COMPRESS_BYTES = int(os.environ.get('CATALOG_MIN_COMPRESS_BYTES', '512'))
+
+
+@lru_cache(maxsize=None)
+def _brotli():
+    # Imported on first use so startup does not pay for it
+    try:
+        import brotli
+    except ImportError:  # brotli is optional; gzip is always available
+        return None
+    return brotli
+
+
+def _encode_json(content) -> bytes:
+    # Same encoding as the app's JSON responses
+    if USE_ORJSON:
+        return dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _parse_accept_encoding(accept_encoding: Optional[str]) -> Dict[str, float]:
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def select_encoding(available, accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the smallest of the `available` codings the client accepts, or None for identity
+    """
+    weights = _parse_accept_encoding(accept_encoding)
+    for coding in ('br', 'gzip'):
+        if coding in available and weights.get(coding, weights.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+class PrecomputedBody:
+    """
+    A response body serialized once, with compressed variants
+    """
+
+    def __init__(self, content):
+        self.identity = _encode_json(content)
+        self.variants: Dict[str, bytes] = {}
+        if len(self.identity) >= CATALOG_MIN_COMPRESS_BYTES:
+            brotli = _brotli()
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(self.identity, quality=CATALOG_BROTLI_QUALITY)
+            self.variants['gzip'] = gzip.compress(self.identity, compresslevel=CATALOG_GZIP_LEVEL, mtime=0)
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Pick the smallest variant the client accepts; returns (body, content encoding)
+        """
+        coding = select_encoding(self.variants, accept_encoding)
+        if coding is None:
+            return self.identity, None
+        return self.variants[coding], coding
+
+
+class CatalogBodies:
+    """
+    Ready-made GET /api/models bodies for every (tier, category) filter combination
+    """
+
+    def __init__(self, index):
+        self._bodies: Dict[Tuple[Optional[str], Optional[str]], PrecomputedBody] = {}
+
+        tiers = [None] + [tier for tier in index.by_tier if tier is not None]
+        categories = [None] + [category for category in index.by_category if category is not None]
+        for tier in tiers:
+            for category in categories:
+                if tier and category and (tier, category) not in index.by_tier_category:
+                    continue
+                models = index.filter(tier=tier, category=category)
+                failed_tiers = [t for t in index.failed_tiers if t == tier] if tier else index.failed_tiers
+                self._bodies[(tier, category)] = PrecomputedBody({
+                    "models": models,
+                    "count": len(models),
+                    "total": len(models),
+                    "next_cursor": None,
+                    "failed_tiers": failed_tiers,
+                })
+
+    def get(self, tier: Optional[str] = None, category: Optional[str] = None) -> Optional[PrecomputedBody]:
+        return self._bodies.get((tier, category))
+
+    def items(self) -> Iterator[Tuple[Tuple[Optional[str], Optional[str]], PrecomputedBody]]:
+        return iter(self._bodies.items())
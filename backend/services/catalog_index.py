@@ -0,0 +1,130 @@
+import hashlib
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+from services.catalog_bodies import CatalogBodies
+from services.catalog_search import SearchIndex
+
+TIERS = ['free', 'basic', 'pro', 'ultra']
+_TIER_RANK = {tier: rank for rank, tier in enumerate(TIERS)}
+
+
+def _name_key(model: Dict):
+    return (model.get('name') or model.get('base_model') or '').lower()
+
+
+def _context_window_key(model: Dict):
+    context_window = model.get('context_window')
+    if not isinstance(context_window, (int, float)):
+        context_window = -1
+    return (context_window, _name_key(model))
+
+
+def _tier_key(model: Dict):
+    return (_TIER_RANK.get(model.get('tier'), len(TIERS)), _name_key(model))
+
+
+SORT_KEYS: Dict[str, Callable[[Dict], object]] = {
+    'name': _name_key,
+    'context_window': _context_window_key,
+    'tier': _tier_key,
+}
+
+
+def catalog_etag(models: List[Dict], failed_tiers: List[str]) -> str:
+    """
+    Content hash of a catalog, used as a weak ETag for catalog responses
+    """
+    canonical = json.dumps(
+        {"models": models, "failed_tiers": failed_tiers},
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str
+    )
+    return f'W/"{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"'
+
+
+class CatalogIndex:
+    """
+    Lookup tables over a catalog snapshot, built once per refresh
+    """
+
+    def __init__(self, models: List[Dict], failed_tiers: Optional[List[str]] = None, etag: Optional[str] = None, bodies=None):
+        self.models = models
+        self.failed_tiers = failed_tiers or []
+        self.etag = etag or catalog_etag(self.models, self.failed_tiers)
+        self.by_base_model: Dict[str, Dict] = {}
+        self.by_name: Dict[str, Dict] = {}
+        self.by_category: Dict[str, List[Dict]] = {}
+        self.by_tier: Dict[str, List[Dict]] = {}
+        self.by_tier_category: Dict[Tuple[str, str], List[Dict]] = {}
+        self._sorted_views: Dict[Tuple[Optional[str], Optional[str], str], List[Dict]] = {}
+
+        for model in models:
+            base_model = model.get('base_model')
+            name = model.get('name')
+            category = model.get('category')
+            tier = model.get('tier')
+
+            # First occurrence wins, matching the catalog order
+            if base_model is not None:
+                self.by_base_model.setdefault(base_model, model)
+            if name is not None:
+                self.by_name.setdefault(name, model)
+            self.by_category.setdefault(category, []).append(model)
+            self.by_tier.setdefault(tier, []).append(model)
+            self.by_tier_category.setdefault((tier, category), []).append(model)
+
+        self.search = SearchIndex(models)
+        # Workers sharing a catalog pass in the bodies another process already compressed
+        self.bodies = bodies if bodies is not None else CatalogBodies(self)
+
+        # Pre-sort the unfiltered catalog; filtered views are sorted on first use
+        for field in SORT_KEYS:
+            self.sorted_view(sort=field)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def get(self, model_name: str) -> Optional[Dict]:
+        """
+        Find a model by base_model or name
+        """
+        model = self.by_base_model.get(model_name)
+        if model is None:
+            model = self.by_name.get(model_name)
+        return model
+
+    def filter(self, tier: Optional[str] = None, category: Optional[str] = None) -> List[Dict]:
+        """
+        Return the models matching tier and/or category
+        """
+        if tier and category:
+            return self.by_tier_category.get((tier, category), [])
+        if tier:
+            return self.by_tier.get(tier, [])
+        if category:
+            return self.by_category.get(category, [])
+        return self.models
+
+    def sorted_view(self, tier: Optional[str] = None, category: Optional[str] = None, sort: Optional[str] = None) -> List[Dict]:
+        """
+        Return the filtered models ordered by sort ('name', 'context_window'
+        or 'tier', '-' prefix for descending). Views over tiers and categories
+        in the catalog are memoized for the lifetime of the index, so paging
+        through one costs O(page size).
+        """
+        models = self.filter(tier=tier, category=category)
+        if not sort:
+            return models
+        if (tier and tier not in self.by_tier) or (category and category not in self.by_category):
+            # Filters come from the query string and unknown values match
+            # nothing; memoizing them would let clients grow the cache
+            return models
+
+        key = (tier, category, sort)
+        view = self._sorted_views.get(key)
+        if view is None:
+            field = sort.lstrip('-')
+            view = sorted(models, key=SORT_KEYS[field], reverse=sort.startswith('-'))
+            self._sorted_views[key] = view
+        return view
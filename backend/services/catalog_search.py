@@ -0,0 +1,100 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Relative weight of a token match per model field
+FIELD_WEIGHTS = {
+    'name': 4.0,
+    'base_model': 4.0,
+    'features': 2.0,
+    'type': 1.0,
+    'category': 1.0,
+    'description': 1.0,
+}
+
+# Prefix matches count for less than whole-token matches
+PREFIX_WEIGHT = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _field_text(value) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _field_text(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _field_text(item)
+
+
+class SearchIndex:
+    """
+    Inverted index over model name, base_model, features, type, category and description
+    """
+
+    def __init__(self, models: List[Dict]):
+        self.models = models
+        postings: Dict[str, Dict[int, float]] = {}
+
+        for position, model in enumerate(models):
+            for field, weight in FIELD_WEIGHTS.items():
+                # A token counts once per field, not once per occurrence
+                tokens = {token for text in _field_text(model.get(field)) for token in tokenize(text)}
+                for token in tokens:
+                    scores = postings.setdefault(token, {})
+                    scores[position] = scores.get(position, 0.0) + weight
+
+        self._postings = postings
+        self._tokens = sorted(postings)
+
+    def _match_token(self, query_token: str) -> Dict[int, float]:
+        """
+        Score models for one query token, counting exact and prefix matches
+        """
+        scores = dict(self._postings.get(query_token, {}))
+        start = bisect_left(self._tokens, query_token)
+        for token in self._tokens[start:]:
+            if not token.startswith(query_token):
+                break
+            if token == query_token:
+                continue
+            for position, weight in self._postings[token].items():
+                scores[position] = max(scores.get(position, 0.0), weight * PREFIX_WEIGHT)
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = 20, tier: Optional[str] = None, category: Optional[str] = None) -> List[Dict]:
+        """
+        Return models matching every query token, best matches first; a limit
+        of None returns every match
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        totals: Optional[Dict[int, float]] = None
+        for query_token in dict.fromkeys(query_tokens):
+            scores = self._match_token(query_token)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {position: totals[position] + score for position, score in scores.items() if position in totals}
+            if not totals:
+                return []
+
+        results = []
+        for position, score in sorted(totals.items(), key=lambda item: (-item[1], item[0])):
+            model = self.models[position]
+            if tier and model.get('tier') != tier:
+                continue
+            if category and model.get('category') != category:
+                continue
+            results.append(model)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import pymongo
+from bson import ObjectId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Startup waits at most this long for the last snapshot before falling back to upstream
+CATALOG_SNAPSHOT_LOAD_TIMEOUT = float(os.environ.get('CATALOG_SNAPSHOT_LOAD_TIMEOUT', '3'))
+# Model rows without a snapshot document are treated as an abandoned save once this old
+CATALOG_SNAPSHOT_ORPHAN_AGE = float(os.environ.get('CATALOG_SNAPSHOT_ORPHAN_AGE', '600'))
+
+
+class CatalogSnapshotStore:
+    """
+    Persists catalog snapshots to MongoDB so new workers can serve the
+    catalog before their first upstream fetch completes
+    """
+
+    def __init__(self, db, models_collection: str = 'catalog_models', snapshots_collection: str = 'catalog_snapshots'):
+        self.models = db[models_collection]
+        self.snapshots = db[snapshots_collection]
+        self._saved_etag: Optional[str] = None
+        self._indexes_ready = False
+
+    async def ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        await self.models.create_index([("snapshot_id", pymongo.ASCENDING), ("position", pymongo.ASCENDING)])
+        await self.models.create_index([("snapshot_id", pymongo.ASCENDING), ("base_model", pymongo.ASCENDING)])
+        await self.models.create_index([("snapshot_id", pymongo.ASCENDING), ("tier", pymongo.ASCENDING)])
+        await self.models.create_index([("snapshot_id", pymongo.ASCENDING), ("category", pymongo.ASCENDING)])
+        await self.snapshots.create_index([("created_at", pymongo.DESCENDING)])
+        self._indexes_ready = True
+
+    async def save(self, index) -> None:
+        """
+        Write a catalog index as the latest snapshot; unchanged catalogs are skipped
+        """
+        if index.etag == self._saved_etag or not index.models:
+            return
+
+        await self.ensure_indexes()
+        snapshot_id = uuid.uuid4().hex
+        documents = [
+            {**model, "snapshot_id": snapshot_id, "position": position}
+            for position, model in enumerate(index.models)
+        ]
+        await self.models.insert_many(documents, ordered=False)
+        # The snapshot document is written last so readers never see a partial snapshot
+        created_at = datetime.now(timezone.utc)
+        await self.snapshots.insert_one({
+            "_id": snapshot_id,
+            "created_at": created_at,
+            "etag": index.etag,
+            "failed_tiers": index.failed_tiers,
+            "count": len(documents),
+        })
+        await self._prune(created_at)
+        self._saved_etag = index.etag
+        logger.info(f"Saved catalog snapshot {snapshot_id} with {len(documents)} models")
+
+    async def _prune(self, created_at: datetime) -> None:
+        """
+        Remove snapshots older than the one written at `created_at`. Newer
+        snapshots and model rows still being written by other workers are kept.
+        """
+        stale = [
+            snapshot["_id"]
+            async for snapshot in self.snapshots.find({"created_at": {"$lt": created_at}}, {"_id": 1})
+        ]
+        if stale:
+            await self.snapshots.delete_many({"_id": {"$in": stale}})
+            await self.models.delete_many({"snapshot_id": {"$in": stale}})
+
+        # Rows from a save that died before writing its snapshot document. The
+        # ObjectId gives the row's age, so saves still in progress are left alone.
+        cutoff = ObjectId.from_datetime(created_at - timedelta(seconds=CATALOG_SNAPSHOT_ORPHAN_AGE))
+        candidates = await self.models.distinct("snapshot_id", {"_id": {"$lt": cutoff}})
+        if not candidates:
+            return
+        live = set(await self.snapshots.distinct("_id", {"_id": {"$in": candidates}}))
+        orphans = [snapshot_id for snapshot_id in candidates if snapshot_id not in live]
+        if orphans:
+            await self.models.delete_many({"snapshot_id": {"$in": orphans}})
+            logger.info(f"Removed model rows of {len(orphans)} abandoned catalog snapshots")
+
+    async def load_latest(self) -> Optional[Dict]:
+        """
+        Return the latest snapshot as {"models", "failed_tiers", "created_at", "etag"}
+        """
+        snapshot = await self.snapshots.find_one(sort=[("created_at", pymongo.DESCENDING)])
+        if snapshot is None:
+            return None
+
+        cursor = self.models.find(
+            {"snapshot_id": snapshot["_id"]},
+            {"_id": 0, "snapshot_id": 0}
+        ).sort("position", pymongo.ASCENDING)
+        models = []
+        async for document in cursor:
+            document.pop("position", None)
+            models.append(document)
+        if len(models) != snapshot.get("count"):
+            logger.warning(f"Catalog snapshot {snapshot['_id']} is incomplete, ignoring it")
+            return None
+
+        self._saved_etag = snapshot.get("etag")
+        return {
+            "models": models,
+            "failed_tiers": snapshot.get("failed_tiers", []),
+            "created_at": snapshot["created_at"],
+            "etag": snapshot.get("etag"),
+        }
+
+    async def restore(self, cache, timeout: float = CATALOG_SNAPSHOT_LOAD_TIMEOUT) -> bool:
+        """
+        Prime a CatalogCache from the latest snapshot; returns whether one was loaded
+        """
+        try:
+            snapshot = await asyncio.wait_for(self.load_latest(), timeout)
+        except Exception as e:
+            logger.warning(f"Could not load catalog snapshot: {type(e).__name__}: {str(e)}")
+            return False
+        if snapshot is None:
+            return False
+
+        created_at = snapshot["created_at"]
+        if created_at.tzinfo is None:
+            # Motor returns naive UTC datetimes unless tz_aware is set
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+        await cache.prime(snapshot["models"], snapshot["failed_tiers"], age)
+        logger.info(f"Restored catalog snapshot with {len(snapshot['models'])} models, {age:.0f}s old")
+        return True
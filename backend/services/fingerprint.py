@@ -0,0 +1,18 @@
+import hashlib
+import json
+from typing import Any
+
+
+def api_key_hash(api_key: str) -> str:
+    """
+    Stable, non-reversible identifier for an API key, safe to log and use as a key
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def canonical_hash(value: Any) -> str:
+    """
+    Hash of a JSON-like value that ignores dict key order
+    """
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
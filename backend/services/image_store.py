@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMAGE_STORE_DIR = os.environ.get('IMAGE_STORE_DIR', os.path.join(tempfile.gettempdir(), 'a4f-images'))
+# Disk budget for offloaded images; least recently used blobs are removed past it
+IMAGE_STORE_MAX_BYTES = int(os.environ.get('IMAGE_STORE_MAX_BYTES', str(1024 * 1024 * 1024)))
+# Replace b64_json in image responses with URLs into the store. Off by default:
+# it changes the /images response shape that existing clients rely on
+IMAGE_OFFLOAD_ENABLED = os.environ.get('IMAGE_OFFLOAD_ENABLED', 'false').lower() == 'true'
+# Images are immutable under their digest, so clients may cache them indefinitely
+IMAGE_CACHE_CONTROL = os.environ.get('IMAGE_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+IMAGE_URL_PREFIX = "/api/playground/images/"
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image_type(head: bytes) -> str:
+    for signature, media_type in _SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class ImageStore:
+    """
+    Content-addressed blob store for generated images, keyed by sha256 so the
+    same image is only stored once and its URL never changes meaning
+    """
+
+    def __init__(self, directory: str = IMAGE_STORE_DIR, max_bytes: int = IMAGE_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[str, str, int]]" = OrderedDict()
+        self.offloaded = 0
+        self.offloaded_bytes = 0
+        self.decode_errors = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def _write(self, b64: str) -> Tuple[str, str, int]:
+        """
+        Decode and store one image; runs in a worker thread
+        """
+        data = base64.b64decode(b64, validate=True)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            # The directory is created on first use rather than at import
+            os.makedirs(self.directory, exist_ok=True)
+            fd, part = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(part, path)
+        return digest, sniff_image_type(data[:16]), len(data)
+
+    def _register(self, digest: str, media_type: str, size: int) -> None:
+        if digest in self._entries:
+            self._entries.move_to_end(digest)
+            return
+        self._entries[digest] = (self._path(digest), media_type, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (old_path, _, old_size) = self._entries.popitem(last=False)
+            self.size_bytes -= old_size
+            self._remove(old_path)
+
+    async def put_b64(self, b64: str) -> str:
+        """
+        Store a base64-encoded image and return its sha256 digest
+        """
+        digest, media_type, size = await asyncio.to_thread(self._write, b64)
+        self._register(digest, media_type, size)
+        self.offloaded += 1
+        self.offloaded_bytes += size
+        return digest
+
+    async def offload(self, result: Dict, url_prefix: str = IMAGE_URL_PREFIX) -> Dict:
+        """
+        Replace b64_json image items in an upstream images response with URLs
+        into the store; pass an absolute `url_prefix` for cross-origin clients
+        """
+        data = result.get("data") or []
+        items = [item for item in data if isinstance(item, dict) and item.get("b64_json")]
+        if not items:
+            return result
+        digests = await asyncio.gather(*(self.put_b64(item["b64_json"]) for item in items), return_exceptions=True)
+        # Rewrite copies: the upstream result may be shared with other callers and carry its original bytes
+        replaced = {}
+        for item, digest in zip(items, digests):
+            if isinstance(digest, (binascii.Error, ValueError)):
+                # Leave undecodable data for the client to deal with
+                self.decode_errors += 1
+                logger.warning(f"Could not decode b64_json image: {str(digest)}")
+                continue
+            if isinstance(digest, BaseException):
+                raise digest
+            copy = {key: value for key, value in item.items() if key != "b64_json"}
+            copy["url"] = f"{url_prefix}{digest}"
+            replaced[id(item)] = copy
+        return {**result, "data": [replaced.get(id(item), item) for item in data]}
+
+    def get(self, digest: str) -> Optional[Tuple[str, str]]:
+        """
+        Return (path, media type) of a stored image. Blobs written by another
+        worker sharing the directory are picked up from disk.
+        """
+        entry = self._entries.get(digest)
+        if entry is not None and os.path.exists(entry[0]):
+            self._entries.move_to_end(digest)
+            return entry[0], entry[1]
+
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(16)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            if entry is not None:
+                del self._entries[digest]
+                self.size_bytes -= entry[2]
+            return None
+        if entry is None:
+            self._register(digest, sniff_image_type(head), size)
+        return path, self._entries[digest][1]
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove image file {path}: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": IMAGE_OFFLOAD_ENABLED,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "offloaded": self.offloaded,
+            "offloaded_bytes": self.offloaded_bytes,
+            "decode_errors": self.decode_errors,
+        }
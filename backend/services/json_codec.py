@@ -0,0 +1,96 @@
+"""
+Fast-path JSON encoding and decoding shared by the API responses and the
+upstream client. Uses orjson when it is installed and selected, and the
+standard library otherwise.
+"""
+import json
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib codec is always available
+    orjson = None
+
+# "orjson" or "json"; orjson falls back to json when it is not installed
+JSON_CODEC = os.environ.get('JSON_CODEC', 'orjson').lower()
+USE_ORJSON = JSON_CODEC == 'orjson' and orjson is not None
+
+
+class RawJSON(dict):
+    """
+    A decoded upstream JSON object that keeps its original bytes, so it can
+    be sent back out without re-encoding. Treat it as read-only: the bytes
+    are not updated if the dict is modified.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, value: dict, raw: bytes):
+        super().__init__(value)
+        self.raw = raw
+
+
+def _default(value: Any) -> Any:
+    # Only reached for types orjson does not serialize natively, including
+    # subclasses because of OPT_PASSTHROUGH_SUBCLASS
+    if isinstance(value, RawJSON):
+        # Newlines can only be whitespace between tokens; embedding them would
+        # break line-delimited output such as NDJSON, so re-encode instead
+        if b"\n" in value.raw or b"\r" in value.raw:
+            return dict(value)
+        return orjson.Fragment(value.raw)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode compactly to UTF-8 JSON bytes; RawJSON values are embedded verbatim
+    """
+    if USE_ORJSON:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+    if isinstance(value, RawJSON):
+        return value.raw
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def loads(data: bytes) -> Any:
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def loads_raw(data: bytes) -> Any:
+    """
+    Decode a JSON body, keeping the original bytes on objects for pass-through
+    """
+    value = loads(data)
+    return RawJSON(value, data) if isinstance(value, dict) else value
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with the shared codec
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# The app's default response class; with JSON_CODEC=json responses are
+# encoded exactly as before
+APIJSONResponse = FastJSONResponse if USE_ORJSON else JSONResponse
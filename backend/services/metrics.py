@@ -0,0 +1,244 @@
+"""
+Minimal Prometheus text-format metrics.
+
+Metric updates happen on the event loop thread only, between awaits, so they
+are plain dict and int operations with no locking. Anything that runs in a
+worker thread must hand its measurements back to the loop before recording.
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Cap on label combinations per metric; further combinations are folded into
+# one "other" series so user-supplied values (e.g. model names) stay bounded
+METRICS_MAX_SERIES = int(os.environ.get('METRICS_MAX_SERIES', '1000'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+OTHER = "other"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Tuple[str, ...]) -> LabelValues:
+        if labels in self._series or len(self._series) < METRICS_MAX_SERIES:
+            return labels
+        return (OTHER,) * len(self.labelnames)
+
+    def _labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self._series.items():
+            lines.append(f"{self.name}{self._labels(values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self._series[self._key(labels)] = value
+
+
+class CallbackMetric(_Metric):
+    """
+    Metric whose series are read from a callback at scrape time, for values
+    that existing components already count
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str], collect: Callable[[], Dict[LabelValues, float]], kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        self._series = dict(self._collect())
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, then sum; cumulated at render time
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        bounds = self.buckets + (float('inf'),)
+        for values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(values, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(values)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{self._labels(values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, labelnames: Iterable[str], collect: Callable[[], Dict[LabelValues, float]], kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, labelnames, collect, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+http_latency = registry.histogram("http_request_duration_seconds", "Time from request start until the response completed", ("route", "method", "status"))
+http_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served")
+http_bytes_in = registry.counter("http_request_bytes_total", "Request body bytes received", ("route",))
+http_bytes_out = registry.counter("http_response_bytes_total", "Response body bytes sent", ("route",))
+
+upstream_requests = registry.counter("a4f_upstream_requests_total", "Calls to the a4f API by endpoint, model and outcome", ("endpoint", "model", "status"))
+upstream_latency = registry.histogram("a4f_upstream_duration_seconds", "a4f API latency until response headers, including retries", ("endpoint", "model", "status"))
+upstream_in_flight = registry.gauge("a4f_upstream_in_flight", "Calls to the a4f API currently waiting for a response", ("endpoint",))
+
+
+class upstream_timer:
+    """
+    Time one upstream call: `async with upstream_timer(endpoint, model) as t`,
+    then set `t.status` once the response status is known
+    """
+
+    __slots__ = ("endpoint", "model", "status", "_started")
+
+    def __init__(self, endpoint: str, model: str = ""):
+        self.endpoint = endpoint
+        self.model = model
+        self.status = "error"
+
+    async def __aenter__(self) -> "upstream_timer":
+        upstream_in_flight.inc(self.endpoint)
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        upstream_in_flight.dec(self.endpoint)
+        status = self.status if exc_type is None else getattr(exc, "status_code", "error")
+        status = str(status)
+        upstream_latency.observe(time.perf_counter() - self._started, self.endpoint, self.model, status)
+        upstream_requests.inc(self.endpoint, self.model, status)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts, latency, bytes and
+    in-flight requests; routes are labelled by their path template
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        bytes_in = 0
+        bytes_out = 0
+        # The route is only known once routing ran, so in-flight is app-wide
+        http_in_flight.inc()
+
+        async def counting_receive():
+            nonlocal bytes_in
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, bytes_out
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            label = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            status_label = str(status)
+            http_latency.observe(time.perf_counter() - started, label, method, status_label)
+            http_requests.inc(label, method, status_label)
+            if bytes_in:
+                http_bytes_in.inc(label, amount=bytes_in)
+            if bytes_out:
+                http_bytes_out.inc(label, amount=bytes_out)
@@ -0,0 +1,328 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+A4F_RETRY_ATTEMPTS = int(os.environ.get('A4F_RETRY_ATTEMPTS', '3'))
+A4F_RETRY_BASE_DELAY = float(os.environ.get('A4F_RETRY_BASE_DELAY', '0.2'))
+A4F_RETRY_MAX_DELAY = float(os.environ.get('A4F_RETRY_MAX_DELAY', '2'))
+A4F_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('A4F_BREAKER_FAILURE_THRESHOLD', '5'))
+A4F_BREAKER_RESET_TIMEOUT = float(os.environ.get('A4F_BREAKER_RESET_TIMEOUT', '30'))
+A4F_HEDGE_ENABLED = os.environ.get('A4F_HEDGE_ENABLED', 'true').lower() == 'true'
+# A hedge is sent once a call has run longer than this latency percentile
+A4F_HEDGE_PERCENTILE = float(os.environ.get('A4F_HEDGE_PERCENTILE', '95'))
+A4F_HEDGE_MIN_SAMPLES = int(os.environ.get('A4F_HEDGE_MIN_SAMPLES', '20'))
+
+# Upstream statuses worth retrying for idempotent calls
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+# Upstream client errors passed through to our callers as-is
+PASSTHROUGH_STATUSES = {400, 401, 403, 404, 413, 415, 422, 429}
+
+
+class UpstreamError(Exception):
+    """
+    A failed upstream call, carrying the HTTP status our API should answer with
+    """
+
+    def __init__(self, message: str, status_code: int = 502, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+    
+    @classmethod
+    def from_httpx(cls, error: httpx.HTTPError) -> "UpstreamError":
+        headers = None
+        if isinstance(error, httpx.HTTPStatusError) and "retry-after" in error.response.headers:
+            headers = {"Retry-After": error.response.headers["retry-after"]}
+        return cls(f"API request failed: {str(error)}", status_code=upstream_status(error), headers=headers)
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(
+            f"Upstream {endpoint} is unavailable, please retry later",
+            status_code=503,
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+
+
+def passthrough_status(status: int) -> int:
+    """
+    Map an upstream error status to the one our API should return
+    """
+    return status if status in PASSTHROUGH_STATUSES else 502
+
+
+def upstream_status(error: Exception) -> int:
+    """
+    Map an httpx error to the status our API should return for it
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return passthrough_status(error.response.status_code)
+    if isinstance(error, httpx.TimeoutException):
+        return 504
+    return 502
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: opens after `failure_threshold` failures,
+    fails fast for `reset_timeout` seconds, then lets one probe call through
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int = A4F_BREAKER_FAILURE_THRESHOLD, reset_timeout: float = A4F_BREAKER_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.failures = 0
+        self.successes = 0
+        self.opened = 0
+        self.short_circuited = 0
+
+    def check(self) -> None:
+        """
+        Raise CircuitOpenError if calls to this endpoint should fail fast
+        """
+        if self.state == 'closed':
+            return
+        if self.state == 'open':
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.endpoint, remaining)
+            self.state = 'half_open'
+        if self._probe_in_flight:
+            self.short_circuited += 1
+            raise CircuitOpenError(self.endpoint, 1)
+        self._probe_in_flight = True
+
+    def release_probe(self) -> None:
+        """
+        End a call without judging upstream health, letting another probe through
+        """
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.successes += 1
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != 'closed':
+            logger.info(f"Circuit for {self.endpoint} closed")
+        self.state = 'closed'
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == 'half_open' or self._consecutive_failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.opened += 1
+                logger.warning(f"Circuit for {self.endpoint} opened after {self._consecutive_failures} consecutive failures")
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "successes": self.successes,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent call latencies
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float:
+        ordered = sorted(self._samples)
+        position = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[position]
+
+
+class Resilience:
+    """
+    Retries with jittered backoff, optional hedging and per-endpoint circuit
+    breakers around upstream calls
+    """
+
+    def __init__(
+        self,
+        attempts: int = A4F_RETRY_ATTEMPTS,
+        base_delay: float = A4F_RETRY_BASE_DELAY,
+        max_delay: float = A4F_RETRY_MAX_DELAY,
+        hedge_enabled: bool = A4F_HEDGE_ENABLED
+    ):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_enabled = hedge_enabled
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+    def _latency(self, endpoint: str) -> LatencyTracker:
+        tracker = self._latencies.get(endpoint)
+        if tracker is None:
+            tracker = self._latencies[endpoint] = LatencyTracker()
+        return tracker
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+    @staticmethod
+    def _retryable_error(error: httpx.TransportError, idempotent: bool) -> bool:
+        # Connection failures never reached upstream, so they are safe to retry for any call
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return True
+        return idempotent and not isinstance(error, httpx.PoolTimeout)
+
+    async def call(
+        self,
+        endpoint: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        idempotent: bool = False,
+        hedge: bool = False,
+        retry: bool = True
+    ) -> httpx.Response:
+        """
+        Run `send` (which must issue a fresh request on every call) under the
+        endpoint's circuit breaker, retrying transient failures
+        """
+        breaker = self.breaker(endpoint)
+        attempts = self.attempts if retry else 1
+
+        for attempt in range(1, attempts + 1):
+            breaker.check()
+            try:
+                if hedge and self.hedge_enabled:
+                    response = await self._hedged(endpoint, send)
+                else:
+                    response = await self._timed(endpoint, send)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if attempt < attempts and self._retryable_error(e, idempotent):
+                    self.retries += 1
+                    logger.warning(f"Retrying {endpoint} after {type(e).__name__} (attempt {attempt})")
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                raise
+            except BaseException:
+                # Cancellation or a local error (bad URL, decoding, reading the
+                # upload body) says nothing about upstream health; let a
+                # half-open breaker probe again
+                breaker.release_probe()
+                raise
+
+            status = response.status_code
+            if status >= 500:
+                breaker.record_failure()
+            elif status == 429:
+                # Rate limits are per API key; counting them would let one
+                # throttled tenant open the circuit for everyone
+                breaker.release_probe()
+            else:
+                breaker.record_success()
+            if status in RETRYABLE_STATUSES and attempt < attempts and idempotent:
+                self.retries += 1
+                logger.warning(f"Retrying {endpoint} after HTTP {status} (attempt {attempt})")
+                await response.aclose()
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            return response
+
+    async def _timed(self, endpoint: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        started = time.monotonic()
+        response = await send()
+        self._latency(endpoint).add(time.monotonic() - started)
+        return response
+
+    async def _hedged(self, endpoint: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Send a second copy of the request if the first is slower than the
+        configured latency percentile; the first non-5xx response wins, and a
+        5xx is only returned once both copies have finished
+        """
+        tracker = self._latency(endpoint)
+        if len(tracker) < A4F_HEDGE_MIN_SAMPLES:
+            return await self._timed(endpoint, send)
+
+        primary = asyncio.ensure_future(self._timed(endpoint, send))
+        done, _ = await asyncio.wait({primary}, timeout=tracker.percentile(A4F_HEDGE_PERCENTILE))
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(self._timed(endpoint, send))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        fallback: Optional[httpx.Response] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner: Optional[asyncio.Future] = None
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None and task.result().status_code < 500:
+                        winner = task
+                    elif fallback is None:
+                        fallback = task.result()
+                    else:
+                        await task.result().aclose()
+                if winner is not None:
+                    if fallback is not None:
+                        await fallback.aclose()
+                    if winner is hedge:
+                        self.hedges_won += 1
+                    return winner.result()
+            if fallback is not None:
+                return fallback
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "breakers": {endpoint: breaker.stats() for endpoint, breaker in self._breakers.items()},
+        }
@@ -0,0 +1,200 @@
+import asyncio
+import fcntl
+import json
+import mmap
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+from services.catalog_bodies import select_encoding
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SHARED_POLL_INTERVAL = float(os.environ.get('CATALOG_SHARED_POLL_INTERVAL', '2'))
+# A cold follower waits this long for the leader's first publish before fetching upstream itself
+CATALOG_SHARED_COLD_WAIT = float(os.environ.get('CATALOG_SHARED_COLD_WAIT', '15'))
+
+_MAGIC = b"A4FCAT2\n"
+
+
+class _MappedBody:
+    """
+    A precomputed catalog body read from the shared file; the bytes stay in
+    the page cache shared by all workers rather than in each process
+    """
+
+    def __init__(self, mm: mmap.mmap, spans: Dict[str, Tuple[int, int]]):
+        self._mm = mm
+        self._spans = spans
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        coding = select_encoding(self._spans, accept_encoding)
+        start, length = self._spans[coding or 'identity']
+        return self._mm[start:start + length], coding
+
+
+class _MappedBodies:
+    """
+    CatalogBodies counterpart backed by the leader's published file
+    """
+
+    def __init__(self, mm: mmap.mmap, base: int, table: List):
+        self._bodies = {
+            (tier, category): _MappedBody(mm, {coding: (base + offset, length) for coding, (offset, length) in spans.items()})
+            for tier, category, spans in table
+        }
+
+    def get(self, tier: Optional[str] = None, category: Optional[str] = None) -> Optional[_MappedBody]:
+        return self._bodies.get((tier, category))
+
+
+class SharedCatalog:
+    """
+    Shares the catalog between uvicorn workers on one host.
+
+    The worker holding an exclusive flock on `<path>.lock` is the leader: it
+    refreshes from upstream and publishes each result to `path`. The file is a
+    magic line, a one-line JSON header (etag, fetch time, body offsets), the
+    JSON catalog and the leader's precomputed response bodies. Followers
+    memory-map the file and read only the header on each poll. They parse the
+    catalog only when the etag changes, and serve the compressed bodies
+    straight from the mapping instead of building their own. A cold follower waits up to
+    `cold_wait` seconds for the leader's first publish, and only then fetches
+    upstream itself.
+    """
+
+    def __init__(self, path: str, poll_interval: float = CATALOG_SHARED_POLL_INTERVAL, cold_wait: float = CATALOG_SHARED_COLD_WAIT):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.cold_wait = cold_wait
+        self._lock_file = None
+        self._seen_etag: Optional[str] = None
+        self._seen_stat = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def try_become_leader(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.path + '.lock', 'a+b')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"Worker {os.getpid()} is the catalog leader")
+        return True
+
+    def release(self) -> None:
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _write(self, index) -> None:
+        body = json.dumps({"models": index.models, "failed_tiers": index.failed_tiers}, separators=(',', ':')).encode()
+        # Body offsets are relative to the end of the catalog JSON
+        blobs = []
+        table = []
+        offset = 0
+        for (tier, category), precomputed in index.bodies.items():
+            spans = {}
+            for coding, blob in (('identity', precomputed.identity), *precomputed.variants.items()):
+                spans[coding] = (offset, len(blob))
+                blobs.append(blob)
+                offset += len(blob)
+            table.append((tier, category, spans))
+        header = json.dumps({
+            "etag": index.etag,
+            "fetched_at": time.time(),
+            "count": len(index.models),
+            "catalog_length": len(body),
+            "bodies": table,
+        })
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(header.encode())
+            f.write(b"\n")
+            f.write(body)
+            for blob in blobs:
+                f.write(blob)
+        # Atomic swap: readers see either the old or the new snapshot, never a mix
+        os.replace(tmp_path, self.path)
+
+    async def publish(self, index) -> None:
+        """
+        CatalogCache refresh listener; only the leader writes
+        """
+        if self.is_leader and index.models:
+            await asyncio.to_thread(self._write, index)
+
+    def read(self) -> Optional[Dict]:
+        """
+        Read the published snapshot if the file changed since the last call.
+        Returns {"fetched_at", "etag"} plus "models"/"failed_tiers"/"bodies"
+        when the catalog content is new, or None when nothing changed.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._seen_stat:
+            return None
+
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(_MAGIC)] != _MAGIC:
+            mm.close()
+            logger.warning(f"Ignoring shared catalog file {self.path} with unknown format")
+            return None
+        header_end = mm.find(b"\n", len(_MAGIC))
+        header = json.loads(mm[len(_MAGIC):header_end])
+        result = {"fetched_at": header["fetched_at"], "etag": header["etag"]}
+        if header["etag"] != self._seen_etag:
+            catalog_end = header_end + 1 + header["catalog_length"]
+            result.update(json.loads(mm[header_end + 1:catalog_end]))
+            # The mapping stays open for as long as the installed index serves these bodies
+            result["bodies"] = _MappedBodies(mm, catalog_end, header["bodies"])
+        else:
+            mm.close()
+
+        self._seen_stat = stat_key
+        self._seen_etag = header["etag"]
+        return result
+
+    async def run(self, cache, refresh_interval: float) -> None:
+        """
+        Background task replacing CatalogCache.run_refresher in shared mode
+        """
+        try:
+            while True:
+                if self.try_become_leader():
+                    cache.background_refresh = True
+                    cache.cold_wait = 0.0
+                    await cache.refresh()
+                    await asyncio.sleep(refresh_interval)
+                    continue
+
+                cache.background_refresh = False
+                cache.cold_wait = self.cold_wait
+                try:
+                    snapshot = await asyncio.to_thread(self.read)
+                except Exception as e:
+                    logger.error(f"Could not read shared catalog: {str(e)}")
+                    snapshot = None
+                if snapshot is not None:
+                    age = time.time() - snapshot["fetched_at"]
+                    if "models" in snapshot:
+                        await cache.replace(snapshot["models"], snapshot["failed_tiers"], age, snapshot["bodies"])
+                    else:
+                        cache.touch(age)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.release()
@@ -0,0 +1,63 @@
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Dict
+
+# Largest audio upload forwarded upstream
+MAX_UPLOAD_BYTES = int(os.environ.get('A4F_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+# httpx reads file fields in chunks of this size while sending the multipart body
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def upload_size(file: BinaryIO) -> int:
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def resident_bytes(file: BinaryIO, size: int) -> int:
+    """
+    Bytes of an upload held in process memory: the whole body while
+    Starlette's spooled file is still in memory, otherwise one send chunk
+    """
+    in_memory = not getattr(file, '_rolled', True)
+    return size if in_memory else min(size, UPLOAD_CHUNK_SIZE)
+
+
+class UploadTracker:
+    """
+    Accounts for memory held by uploads that are being forwarded upstream
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.resident_bytes = 0
+        self.peak_resident_bytes = 0
+        self.forwarded_bytes = 0
+        self.forwarded = 0
+        self.rejected = 0
+
+    @contextmanager
+    def track(self, size: int, resident: int):
+        self.in_flight += 1
+        self.resident_bytes += resident
+        self.peak_resident_bytes = max(self.peak_resident_bytes, self.resident_bytes)
+        try:
+            yield
+            self.forwarded += 1
+            self.forwarded_bytes += size
+        finally:
+            self.in_flight -= 1
+            self.resident_bytes -= resident
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "resident_bytes": self.resident_bytes,
+            "peak_resident_bytes": self.peak_resident_bytes,
+            "forwarded": self.forwarded,
+            "forwarded_bytes": self.forwarded_bytes,
+            "rejected": self.rejected,
+            "max_upload_bytes": MAX_UPLOAD_BYTES,
+        }
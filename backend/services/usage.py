@@ -0,0 +1,209 @@
+import asyncio
+import itertools
+import os
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Records waiting to be written; when full the oldest unwritten records are dropped
+USAGE_BUFFER_SIZE = int(os.environ.get('USAGE_BUFFER_SIZE', '10000'))
+USAGE_FLUSH_INTERVAL = float(os.environ.get('USAGE_FLUSH_INTERVAL', '5'))
+USAGE_FLUSH_BATCH = int(os.environ.get('USAGE_FLUSH_BATCH', '500'))
+# Distinct models and API keys tracked in the in-memory summary; further
+# values are folded into one "other" entry so client input stays bounded
+USAGE_MAX_SUMMARY_ENTRIES = int(os.environ.get('USAGE_MAX_SUMMARY_ENTRIES', '1000'))
+OTHER = "other"
+# Upper bound for the final flush on shutdown, so an unreachable database cannot hold up exit
+USAGE_SHUTDOWN_FLUSH_TIMEOUT = float(os.environ.get('USAGE_SHUTDOWN_FLUSH_TIMEOUT', '5'))
+
+_TOTAL_FIELDS = ("requests", "errors", "prompt_tokens", "completion_tokens", "total_tokens", "latency_ms", "bytes_in", "bytes_out")
+
+
+def _empty_totals() -> Dict[str, float]:
+    return dict.fromkeys(_TOTAL_FIELDS, 0)
+
+
+def _totals_for(table: Dict[str, Dict[str, float]], name: str) -> Dict[str, float]:
+    totals = table.get(name)
+    if totals is None:
+        if len(table) >= USAGE_MAX_SUMMARY_ENTRIES:
+            name = OTHER
+        totals = table.setdefault(name, _empty_totals())
+    return totals
+
+
+class UsageRecorder:
+    """
+    Collects per-request usage records in memory and writes them to MongoDB
+    in batches from a background task, so request handlers never wait on the
+    database. Summary aggregates are kept up to date as records arrive.
+    """
+
+    def __init__(self, db=None, collection: str = 'usage_events', capacity: int = USAGE_BUFFER_SIZE, batch_size: int = USAGE_FLUSH_BATCH):
+        self.events = db[collection] if db is not None else None
+        self.batch_size = batch_size
+        self._buffer: Deque[Dict] = deque(maxlen=capacity)
+        self._listeners: List[Callable[[List[Dict]], Awaitable[None]]] = []
+        self.started_at = datetime.now(timezone.utc)
+        self.totals = _empty_totals()
+        self.by_model: Dict[str, Dict[str, float]] = {}
+        self.by_key: Dict[str, Dict[str, float]] = {}
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def attach(self, db, collection: str = 'usage_events') -> None:
+        self.events = db[collection]
+
+    def add_listener(self, listener: Callable[[List[Dict]], Awaitable[None]]) -> None:
+        """
+        Register a coroutine called with each batch after it has been written
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[List[Dict]], Awaitable[None]]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def record(
+        self,
+        key_hash: str,
+        endpoint: str,
+        model: str,
+        latency: float,
+        usage: Optional[Dict] = None,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        status: int = 200
+    ) -> None:
+        """
+        Buffer one usage record and fold it into the running aggregates
+        """
+        usage = usage if isinstance(usage, dict) else {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        record = {
+            "ts": datetime.now(timezone.utc),
+            "key_hash": key_hash,
+            "endpoint": endpoint,
+            "model": model,
+            "status": status,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": usage.get("total_tokens") or prompt_tokens + completion_tokens,
+            "latency_ms": round(latency * 1000, 3),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+        }
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(record)
+        self.recorded += 1
+
+        for totals in (
+            self.totals,
+            _totals_for(self.by_model, model),
+            _totals_for(self.by_key, key_hash),
+        ):
+            totals["requests"] += 1
+            if status >= 400:
+                totals["errors"] += 1
+            for field in _TOTAL_FIELDS[2:]:
+                totals[field] += record[field]
+
+    def _take(self, batch: List[Dict]) -> None:
+        # record() may have run during the insert, and a full buffer evicts from
+        # the left, so only drop the written records that are still at the front
+        for record in batch:
+            if self._buffer and self._buffer[0] is record:
+                self._buffer.popleft()
+
+    async def flush(self) -> int:
+        """
+        Write buffered records in batches; returns how many were written
+        """
+        if self.events is None:
+            return 0
+        written = 0
+        while self._buffer:
+            # Records stay in the buffer until the insert succeeds, so a failed
+            # or cancelled write leaves them for the next flush
+            batch = list(itertools.islice(self._buffer, self.batch_size))
+            try:
+                # insert_many adds _id to the documents; listeners get them as written
+                await self.events.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # A write cancelled after it reached the server is retried with the
+                # same _ids; records that are already stored count as written
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    self.flush_errors += 1
+                    logger.error(f"Usage flush error: {type(e).__name__}: {str(e)}")
+                    break
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"Usage flush error: {type(e).__name__}: {str(e)}")
+                break
+            self._take(batch)
+            written += len(batch)
+            for listener in self._listeners:
+                try:
+                    await listener(batch)
+                except Exception as e:
+                    logger.error(f"Usage listener error: {type(e).__name__}: {str(e)}")
+        if written:
+            self.written += written
+            self.flushes += 1
+        return written
+
+    async def run(self, interval: float = USAGE_FLUSH_INTERVAL) -> None:
+        """
+        Flush periodically until cancelled, then flush what is left
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush()
+        finally:
+            try:
+                await asyncio.wait_for(self.flush(), USAGE_SHUTDOWN_FLUSH_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Final usage flush timed out; {len(self._buffer)} records not written")
+
+    @staticmethod
+    def _summary(totals: Dict[str, float]) -> Dict:
+        requests = totals["requests"]
+        summary = {field: totals[field] for field in _TOTAL_FIELDS if field != "latency_ms"}
+        summary["latency_ms_avg"] = round(totals["latency_ms"] / requests, 3) if requests else 0.0
+        return summary
+
+    def summary(self, key_hash: Optional[str] = None) -> Dict:
+        """
+        Aggregates since this process started, optionally for one API key
+        """
+        summary = {
+            "since": self.started_at.isoformat(),
+            "totals": self._summary(self.totals),
+            "by_model": {model: self._summary(totals) for model, totals in self.by_model.items()},
+        }
+        if key_hash is not None:
+            summary["key"] = self._summary(self.by_key.get(key_hash, _empty_totals()))
+        return summary
+
+    def stats(self) -> Dict:
+        return {
+            "buffered": len(self._buffer),
+            "capacity": self._buffer.maxlen,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pymongo
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = ("requests", "errors", "prompt_tokens", "completion_tokens", "total_tokens", "latency_ms", "bytes_in", "bytes_out")
+ROLLUP_DIMENSIONS = ("endpoint", "model", "key_hash")
+GRANULARITIES = ("hour", "day")
+
+
+def _utc_naive(ts: datetime) -> datetime:
+    # MongoDB stores naive UTC datetimes
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """
+    Truncate a timestamp to the start of its hour or day (UTC)
+    """
+    ts = _utc_naive(ts)
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+class UsageRollupStore:
+    """
+    Hourly and daily usage totals per endpoint, model and API key hash,
+    maintained with $inc upserts as usage batches are flushed so queries
+    never scan raw events
+    """
+
+    def __init__(self, db=None, prefix: str = 'usage'):
+        self.prefix = prefix
+        self.collections = {}
+        self._indexes_ready = False
+        self.batches = 0
+        self.upserts = 0
+        if db is not None:
+            self.attach(db)
+
+    def attach(self, db) -> None:
+        self.collections = {"hour": db[f"{self.prefix}_hourly"], "day": db[f"{self.prefix}_daily"]}
+
+    @property
+    def attached(self) -> bool:
+        return bool(self.collections)
+
+    async def ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        for collection in self.collections.values():
+            # Upsert target; also serves time-range scans across all models
+            await collection.create_index(
+                [("bucket", pymongo.ASCENDING), ("endpoint", pymongo.ASCENDING), ("model", pymongo.ASCENDING), ("key_hash", pymongo.ASCENDING)],
+                unique=True
+            )
+            await collection.create_index([("model", pymongo.ASCENDING), ("bucket", pymongo.ASCENDING)])
+            await collection.create_index([("key_hash", pymongo.ASCENDING), ("bucket", pymongo.ASCENDING)])
+        self._indexes_ready = True
+
+    async def apply(self, records: List[Dict]) -> None:
+        """
+        Fold a flushed batch of usage records into the rollups. Records are
+        pre-aggregated per bucket so each bucket costs one upsert per batch.
+        """
+        if not self.attached or not records:
+            return
+        await self.ensure_indexes()
+        for granularity, collection in self.collections.items():
+            totals: Dict[Tuple, Dict[str, float]] = {}
+            for record in records:
+                key = (bucket_start(record["ts"], granularity),) + tuple(record.get(dimension, "") for dimension in ROLLUP_DIMENSIONS)
+                bucket = totals.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+                bucket["requests"] += 1
+                if record.get("status", 200) >= 400:
+                    bucket["errors"] += 1
+                for field in ROLLUP_FIELDS[2:]:
+                    bucket[field] += record.get(field, 0)
+
+            operations = [
+                UpdateOne(
+                    {"bucket": key[0], **dict(zip(ROLLUP_DIMENSIONS, key[1:]))},
+                    {"$inc": increments},
+                    upsert=True
+                )
+                for key, increments in totals.items()
+            ]
+            await collection.bulk_write(operations, ordered=False)
+            self.upserts += len(operations)
+        self.batches += 1
+
+    async def query(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        group_by: Optional[str] = "model",
+        model: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        key_hash: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Sum rollup buckets in [start, end) per bucket and optional dimension
+        """
+        await self.ensure_indexes()
+        match = {"bucket": {"$gte": bucket_start(start, granularity), "$lt": _utc_naive(end)}}
+        for field, value in (("model", model), ("endpoint", endpoint), ("key_hash", key_hash)):
+            if value is not None:
+                match[field] = value
+
+        group_id = {"bucket": "$bucket"}
+        if group_by:
+            group_id[group_by] = f"${group_by}"
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": group_id, **{field: {"$sum": f"${field}"} for field in ROLLUP_FIELDS}}},
+            {"$sort": {"_id.bucket": 1}},
+        ]
+
+        rows = []
+        async for document in self.collections[granularity].aggregate(pipeline):
+            group = document.pop("_id")
+            bucket = group.pop("bucket").replace(tzinfo=timezone.utc)
+            requests = document["requests"]
+            rows.append({
+                "bucket": bucket.isoformat(),
+                **group,
+                **{field: document[field] for field in ROLLUP_FIELDS if field != "latency_ms"},
+                "latency_ms_avg": round(document["latency_ms"] / requests, 3) if requests else 0.0,
+            })
+        return rows
+
+    def stats(self) -> Dict:
+        return {"batches": self.batches, "upserts": self.upserts}
+
+
+def default_window(granularity: str) -> timedelta:
+    return timedelta(days=1) if granularity == "hour" else timedelta(days=30)
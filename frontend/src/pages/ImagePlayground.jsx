@@ -47,8 +47,11 @@ const ImagePlayground = () => {
         prompt
       );
 
-      if (response.data && response.data[0] && response.data[0].url) {
-        setGeneratedImage(response.data[0].url);
+      const image = response.data && response.data[0];
+      if (image && image.url) {
+        setGeneratedImage(image.url);
+      } else if (image && image.b64_json) {
+        setGeneratedImage(`data:image/png;base64,${image.b64_json}`);
       } else {
         throw new Error('Invalid response format');
       }
@@ -10,6 +10,7 @@ const Models = () => {
   const [selectedTier, setSelectedTier] = useState('all');
   const [selectedCategory, setSelectedCategory] = useState('all');
   const [models, setModels] = useState([]);
+  const [searchResults, setSearchResults] = useState(null);
   const [totalCount, setTotalCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -75,19 +76,39 @@ const Models = () => {
     fetchModels();
   }, [selectedTier, selectedCategory]);
 
+  // Search runs server-side against the catalog search index
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const filters = {};
+        if (selectedTier !== 'all') filters.tier = selectedTier;
+        if (selectedCategory !== 'all') filters.category = selectedCategory;
+
+        const data = await modelsAPI.searchModels(query, filters);
+        if (!cancelled) setSearchResults(data.models || []);
+      } catch (err) {
+        console.error('Error searching models:', err);
+        if (!cancelled) setSearchResults([]);
+      }
+    }, 200);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, selectedTier, selectedCategory]);
+
   const filteredModels = useMemo(() => {
-    if (!searchQuery) return models;
-    
-    return models.filter(model => {
-      const searchLower = searchQuery.toLowerCase();
-      const matchesName = (model.name || model.base_model || '').toLowerCase().includes(searchLower);
-      const matchesDescription = (model.description || '').toLowerCase().includes(searchLower);
-      const matchesType = (model.type || '').toLowerCase().includes(searchLower);
-      const matchesCategory = (model.category || '').toLowerCase().includes(searchLower);
-      
-      return matchesName || matchesDescription || matchesType || matchesCategory;
-    });
-  }, [models, searchQuery]);
+    if (!searchQuery.trim() || searchResults === null) return models;
+    return searchResults;
+  }, [models, searchQuery, searchResults]);
 
   const getTierColor = (tier) => {
     switch (tier) {
@@ -12,6 +12,24 @@ export const modelsAPI = {
     return response.data;
   },
   
+  searchModels: async (query, filters = {}) => {
+    const params = { q: query, limit: 200 };
+    if (filters.tier) params.tier = filters.tier;
+    if (filters.category) params.category = filters.category;
+    
+    // Follow next_cursor so broad queries return every match
+    const models = [];
+    let cursor = null;
+    do {
+      const response = await axios.get(`${API_BASE}/models/search`, {
+        params: cursor ? { ...params, cursor } : params
+      });
+      models.push(...(response.data.models || []));
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return { models, count: models.length, total: models.length };
+  },
+  
   fetchModelByName: async (modelName) => {
     const response = await axios.get(`${API_BASE}/models/${modelName}`);
     return response.data;
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_queued_keys_are_served_round_robin():
+    async def scenario():
+        controller = AdmissionController(per_key_limit=1, global_limit=1)
+        await controller.acquire("holder")
+        order = []
+
+        async def caller(key, name):
+            await controller.acquire(key)
+            order.append((key, name))
+
+        tasks = [asyncio.create_task(caller("a", n)) for n in range(3)]
+        await _settle()
+        tasks.append(asyncio.create_task(caller("b", 0)))
+        await _settle()
+        assert controller.stats()["queue_depth"] == 4
+
+        controller.release("holder")
+        while len(order) < 4:
+            await _settle()
+            controller.release(order[-1][0])
+        await asyncio.gather(*tasks)
+        # The busy key does not make the later key wait behind its whole queue
+        assert order == [("a", 0), ("b", 0), ("a", 1), ("a", 2)]
+
+    asyncio.run(scenario())
+
+
+def test_per_key_limit_does_not_block_other_keys():
+    async def scenario():
+        controller = AdmissionController(per_key_limit=1, global_limit=4)
+        await controller.acquire("a")
+        waiting = asyncio.create_task(controller.acquire("a"))
+        await _settle()
+        await asyncio.wait_for(controller.acquire("b"), 1)
+        assert not waiting.done()
+        controller.release("a")
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(scenario())
+
+
+def test_timeout_returns_a_slot_granted_at_the_deadline(monkeypatch):
+    async def scenario():
+        controller = AdmissionController(per_key_limit=1, global_limit=1, max_wait=1)
+        await controller.acquire("a")
+        real_wait_for = asyncio.wait_for
+
+        async def grant_then_time_out(awaitable, timeout):
+            # The slot is handed over in the same loop turn the wait times out
+            controller.release("a")
+            awaitable.cancel()
+            raise asyncio.TimeoutError()
+
+        monkeypatch.setattr(asyncio, "wait_for", grant_then_time_out)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("a")
+        monkeypatch.setattr(asyncio, "wait_for", real_wait_for)
+
+        stats = controller.stats()
+        assert stats["admitted"] == 2
+        assert stats["active"] == 0
+        assert stats["queue_depth"] == 0
+        assert stats["timeouts"] == 1
+        # The slot was not leaked, so the next caller gets in immediately
+        await asyncio.wait_for(controller.acquire("a"), 1)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_hands_its_grant_to_the_next_caller():
+    async def scenario():
+        controller = AdmissionController(per_key_limit=1, global_limit=1)
+        await controller.acquire("a")
+        first = asyncio.create_task(controller.acquire("a"))
+        second = asyncio.create_task(controller.acquire("a"))
+        await _settle()
+
+        # Grant the first waiter, then cancel it before it resumes
+        controller.release("a")
+        first.cancel()
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+        else:
+            # Before Python 3.12 wait_for returns a result that raced a
+            # cancellation, so the first caller keeps the slot
+            assert not second.done()
+            controller.release("a")
+        await asyncio.wait_for(second, 1)
+        assert controller.stats()["active"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        controller = AdmissionController(per_key_limit=1, per_key_max_queue=1)
+        await controller.acquire("a")
+        waiting = asyncio.create_task(controller.acquire("a"))
+        await _settle()
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await controller.acquire("a")
+        assert exc_info.value.status_code == 429
+        waiting.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+from bson import ObjectId
+
+from services.a4f_service import CatalogCache
+from services.catalog_index import CatalogIndex
+from services.catalog_store import CatalogSnapshotStore
+
+MODELS = [
+    {"id": "provider-1/model-a", "base_model": "model-a", "tier": "free", "category": "chat"},
+    {"id": "provider-2/model-b", "base_model": "model-b", "tier": "pro", "category": "image"},
+]
+
+
+def _db():
+    return mongomock_motor.AsyncMongoMockClient()["test"]
+
+
+async def _no_loader():
+    raise AssertionError("restore should not hit upstream")
+
+
+def test_save_and_restore_round_trip():
+    async def scenario():
+        store = CatalogSnapshotStore(_db())
+        await store.save(CatalogIndex(MODELS, ["enterprise"]))
+
+        cache = CatalogCache(_no_loader)
+        assert await CatalogSnapshotStore(store.models.database).restore(cache)
+        assert await cache.get() == MODELS
+        assert cache.failed_tiers == ["enterprise"]
+        assert not cache.is_stale()
+
+    asyncio.run(scenario())
+
+
+def test_save_skips_unchanged_catalog():
+    async def scenario():
+        store = CatalogSnapshotStore(_db())
+        index = CatalogIndex(MODELS)
+        await store.save(index)
+        await store.save(index)
+        assert await store.snapshots.count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_save_keeps_snapshot_being_written_by_another_worker():
+    async def scenario():
+        db = _db()
+        first = CatalogSnapshotStore(db)
+        await first.save(CatalogIndex(MODELS))
+        await db["catalog_snapshots"].update_many({}, {"$set": {"created_at": datetime.now(timezone.utc) - timedelta(minutes=5)}})
+        # Another worker has inserted its model rows but not yet its snapshot document
+        await db["catalog_models"].insert_one({**MODELS[0], "snapshot_id": "in-progress", "position": 0})
+
+        await CatalogSnapshotStore(db).save(CatalogIndex(MODELS[:1]))
+
+        assert await db["catalog_snapshots"].count_documents({}) == 1
+        assert await db["catalog_models"].count_documents({"snapshot_id": "in-progress"}) == 1
+        latest = await first.load_latest()
+        assert latest["models"] == MODELS[:1]
+
+    asyncio.run(scenario())
+
+
+def test_save_removes_rows_of_abandoned_snapshots():
+    async def scenario():
+        db = _db()
+        models = db["catalog_models"]
+        # A worker died between writing its model rows and its snapshot document
+        abandoned_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        await models.insert_one({**MODELS[0], "_id": ObjectId.from_datetime(abandoned_at), "snapshot_id": "abandoned", "position": 0})
+        await models.insert_one({**MODELS[0], "snapshot_id": "in-progress", "position": 0})
+
+        await CatalogSnapshotStore(db).save(CatalogIndex(MODELS))
+
+        assert await models.count_documents({"snapshot_id": "abandoned"}) == 0
+        assert await models.count_documents({"snapshot_id": "in-progress"}) == 1
+        assert await models.count_documents({}) == len(MODELS) + 1
+
+    asyncio.run(scenario())
+
+
+def test_incomplete_snapshot_is_ignored():
+    async def scenario():
+        store = CatalogSnapshotStore(_db())
+        await store.save(CatalogIndex(MODELS))
+        await store.models.delete_one({"position": 1})
+
+        cache = CatalogCache(_no_loader)
+        assert await store.load_latest() is None
+        assert not await store.restore(cache)
+        assert cache.age is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import resilience
+from services.resilience import A4F_HEDGE_MIN_SAMPLES, CircuitBreaker, CircuitOpenError, Resilience
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.check()
+        breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_open_breaker_fails_fast_until_reset_timeout(clock):
+    breaker = CircuitBreaker("chat", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker("chat", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 31
+
+    breaker.check()
+    assert breaker.state == 'half_open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    breaker.check()
+    breaker.check()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("chat", failure_threshold=3, reset_timeout=30)
+    _open(breaker)
+    clock.now += 31
+
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.now += 31
+    breaker.check()
+    assert breaker.state == 'half_open'
+
+
+def test_released_probe_allows_another_probe(clock):
+    breaker = CircuitBreaker("chat", failure_threshold=2, reset_timeout=30)
+    _open(breaker)
+    clock.now += 31
+
+    breaker.check()
+    # e.g. the probe was rate limited: neither healthy nor failing
+    breaker.release_probe()
+    assert breaker.state == 'half_open'
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_local_error_during_probe_releases_it():
+    async def scenario():
+        calls = Resilience(attempts=1)
+        breaker = calls.breaker("chat")
+        breaker.reset_timeout = 0
+        _open(breaker)
+
+        async def broken():
+            raise httpx.DecodingError("bad gzip")
+
+        async def healthy():
+            return httpx.Response(200)
+
+        with pytest.raises(httpx.DecodingError):
+            await calls.call("chat", broken)
+        # The failed probe must not leave the breaker short-circuiting forever
+        assert (await calls.call("chat", healthy)).status_code == 200
+        assert breaker.state == 'closed'
+
+    asyncio.run(scenario())
+
+
+def test_hedge_prefers_a_slower_success_over_a_5xx():
+    async def scenario():
+        calls = Resilience(attempts=1, hedge_enabled=True)
+        tracker = calls._latency("chat")
+        for _ in range(A4F_HEDGE_MIN_SAMPLES):
+            tracker.add(0.001)
+        sent = []
+
+        async def send():
+            sent.append(1)
+            if len(sent) == 1:
+                await asyncio.sleep(0.05)
+                return httpx.Response(200)
+            return httpx.Response(503)
+
+        response = await calls.call("chat", send, hedge=True)
+        assert response.status_code == 200
+        assert calls.stats()["hedges"] == 1
+        assert calls.stats()["hedges_won"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+import asyncio
+
+from services.a4f_service import CatalogCache
+from services.shared_catalog import SharedCatalog
+
+MODELS = [
+    {"id": "provider-1/model-a", "base_model": "model-a", "tier": "free", "category": "chat_completion", "description": "Fast general purpose chat model. " * 20},
+    {"id": "provider-2/model-b", "base_model": "model-b", "tier": "pro", "category": "image_generation", "description": "High quality image model. " * 20},
+]
+
+
+def test_cold_follower_waits_for_the_leader(tmp_path):
+    async def scenario():
+        follower_fetches = []
+
+        async def leader_loader():
+            await asyncio.sleep(0.2)
+            return {"models": MODELS, "failed_tiers": []}
+
+        async def follower_loader():
+            follower_fetches.append(1)
+            return {"models": MODELS, "failed_tiers": []}
+
+        path = str(tmp_path / "catalog")
+        leader_cache, follower_cache = CatalogCache(leader_loader), CatalogCache(follower_loader)
+        leader, follower = SharedCatalog(path, poll_interval=0.05), SharedCatalog(path, poll_interval=0.05)
+        leader_cache.add_listener(leader.publish)
+        tasks = [asyncio.create_task(leader.run(leader_cache, 60))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(follower.run(follower_cache, 60)))
+        await asyncio.sleep(0)
+        try:
+            index = await asyncio.wait_for(follower_cache.get_index(), 5)
+            assert index.etag == leader_cache.index.etag
+            assert follower_fetches == []
+            # Compressed bodies come from the leader's file rather than being rebuilt
+            assert index.bodies is not leader_cache.index.bodies
+            for tier, category in [(None, None), ("free", None), ("pro", "image_generation")]:
+                for accept_encoding in [None, "gzip", "br, gzip"]:
+                    expected = leader_cache.index.bodies.get(tier, category).select(accept_encoding)
+                    assert index.bodies.get(tier, category).select(accept_encoding) == expected
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(scenario())
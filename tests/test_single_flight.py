@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        executions = []
+
+        async def fetch():
+            executions.append(1)
+            await release.wait()
+            return "catalog"
+
+        callers = [asyncio.create_task(flight.do("models", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*callers) == ["catalog"] * 5
+        assert len(executions) == 1
+        assert flight.stats()["merged"] == 4
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "catalog"
+
+        first = asyncio.create_task(flight.do("models", fetch))
+        second = asyncio.create_task(flight.do("models", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        release.set()
+        assert await second == "catalog"
+
+    asyncio.run(scenario())
+
+
+def test_exception_is_shared_and_key_is_released():
+    async def scenario():
+        flight = SingleFlight()
+        attempts = []
+
+        async def fetch():
+            attempts.append(1)
+            await asyncio.sleep(0)
+            if len(attempts) == 1:
+                raise RuntimeError("upstream down")
+            return "catalog"
+
+        results = await asyncio.gather(
+            flight.do("models", fetch), flight.do("models", fetch), return_exceptions=True
+        )
+        assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+        # A failed call is not cached; the next caller runs it again
+        assert await flight.do("models", fetch) == "catalog"
+        assert flight.stats()["executions"] == 2
+
+    asyncio.run(scenario())